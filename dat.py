@@ -7,6 +7,11 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics import r2_score, mean_squared_error
 from scipy import stats
 from scipy.optimize import minimize
+from rsm import prediction_bands
+from rsm_compile import compile_polynomial
+from rsm_anova import rsm_anova
+from rsm_sensitivity import sobol_indices
+from rsm_gp import compare_with_quadratic
 from docx import Document
 from docx.shared import Inches, Pt
 from io import BytesIO
@@ -74,6 +79,14 @@ ms_residual = ss_residual / df_residual
 f_statistic = ms_regression / ms_residual
 p_value = 1 - stats.f.cdf(f_statistic, df_regression, df_residual)
 
+# Coefficient vector over all polynomial columns and (X'X)^-1 for prediction uncertainty
+coef_full = model.coef_.copy()
+coef_full[0] += model.intercept_
+xtx_inv = np.linalg.pinv(X_poly.T @ X_poly)
+
+# Compiled Horner-form evaluator of the same polynomial (PolynomialFeatures exponents)
+compiled_model = compile_polynomial(coef_full, poly.powers_, response='Oil Yield (%)')
+
 # Create Word document
 doc = Document()
 doc.add_heading('Jatropha Oil Extraction Analysis Report', 0)
@@ -127,6 +140,20 @@ anova_table.rows[3].cells[0].text = 'Total'
 anova_table.rows[3].cells[1].text = f'{ss_total:.4f}'
 anova_table.rows[3].cells[2].text = f'{df_total}'
 
+# Full ANOVA: per-term sums of squares and lack of fit against the replicated centre points
+doc.add_heading('3.1 Full ANOVA with Lack-of-Fit Test', 2)
+full_anova = rsm_anova(X_coded, y)
+full_table = doc.add_table(rows=1, cols=7)
+full_table.style = 'Light Grid Accent 1'
+for i, header in enumerate(['Source', 'DF', 'Seq SS', 'Adj SS', 'Adj MS', 'F-value', 'P-value']):
+    full_table.rows[0].cells[i].text = header
+for _, row in full_anova.iterrows():
+    cells = full_table.add_row().cells
+    cells[0].text = row['Source']
+    cells[1].text = f"{int(row['DF'])}"
+    for i, col in enumerate(['Seq_SS', 'Adj_SS', 'Adj_MS', 'F', 'p_value'], 2):
+        cells[i].text = '' if pd.isna(row[col]) else f'{row[col]:.4f}'
+
 doc.add_page_break()
 
 # Generate contour and surface plots
@@ -177,35 +204,17 @@ for var1, var2, fix1, fix2 in plot_pairs:
     V1_coded = actual_to_coded(V1, var1)
     V2_coded = actual_to_coded(V2, var2)
     
-    # Create prediction grid
-    Z = np.zeros_like(V1)
-    
-    for i in range(V1.shape[0]):
-        for j in range(V1.shape[1]):
-            # Set up input vector
-            input_coded = [0, 0, 0, 0]
-            
-            if var1 == 'X1':
-                input_coded[0] = V1_coded[i, j]
-            elif var1 == 'X2':
-                input_coded[1] = V1_coded[i, j]
-            elif var1 == 'X3':
-                input_coded[2] = V1_coded[i, j]
-            elif var1 == 'X4':
-                input_coded[3] = V1_coded[i, j]
-                
-            if var2 == 'X1':
-                input_coded[0] = V2_coded[i, j]
-            elif var2 == 'X2':
-                input_coded[1] = V2_coded[i, j]
-            elif var2 == 'X3':
-                input_coded[2] = V2_coded[i, j]
-            elif var2 == 'X4':
-                input_coded[3] = V2_coded[i, j]
-            
-            # Transform and predict
-            input_poly = poly.transform([input_coded])
-            Z[i, j] = model.predict(input_poly)[0]
+    # Whole grid as one design matrix (other factors fixed at 0)
+    grid_coded = np.zeros((V1.size, 4))
+    grid_coded[:, int(var1[1]) - 1] = V1_coded.ravel()
+    grid_coded[:, int(var2[1]) - 1] = V2_coded.ravel()
+    grid_poly = poly.transform(grid_coded)
+
+    # Mean, standard error and 95% intervals in one batched quadratic form
+    bands = prediction_bands(grid_poly, coef_full, xtx_inv, ms_residual, df_residual)
+    Z = bands['mean'].reshape(V1.shape)
+    SE = bands['se_mean'].reshape(V1.shape)
+    PI_half = ((bands['pi_high'] - bands['pi_low']) / 2).reshape(V1.shape)
     
     # Contour plot
     fig, ax = plt.subplots(figsize=(10, 7))
@@ -246,6 +255,27 @@ for var1, var2, fix1, fix2 in plot_pairs:
     buf.seek(0)
     plt.close()
     
+    # Add to document
+    doc.add_picture(buf, width=Inches(6))
+
+    # Uncertainty maps: standard error of the mean and 95% prediction interval half-width
+    fig, axes = plt.subplots(1, 2, figsize=(14, 6))
+    for ax, surface, title in [(axes[0], SE, 'Standard Error of Predicted Mean (%)'),
+                               (axes[1], PI_half, '95% Prediction Interval Half-width (%)')]:
+        cs = ax.contourf(V1, V2, surface, levels=15, cmap='magma')
+        plt.colorbar(cs, ax=ax, label=title)
+        ax.set_xlabel(labels[var1], fontsize=11, fontweight='bold')
+        ax.set_ylabel(labels[var2], fontsize=11, fontweight='bold')
+        ax.set_title(title, fontsize=12, fontweight='bold')
+        ax.grid(True, alpha=0.3)
+
+    # Save to buffer
+    buf = BytesIO()
+    plt.tight_layout()
+    plt.savefig(buf, format='png', dpi=300, bbox_inches='tight')
+    buf.seek(0)
+    plt.close()
+
     # Add to document
     doc.add_picture(buf, width=Inches(6))
     doc.add_page_break()
@@ -256,8 +286,7 @@ for var1, var2, fix1, fix2 in plot_pairs:
 doc.add_heading('5. Optimization Results', 1)
 
 def objective(x_coded):
-    x_poly = poly.transform([x_coded])
-    return -model.predict(x_poly)[0]  # Negative for maximization
+    return -compiled_model(x_coded)  # Negative for maximization
 
 # Bounds (coded values: -2 to 2)
 bounds = [(-2, 2), (-2, 2), (-2, 2), (-2, 2)]
@@ -294,16 +323,51 @@ doc.add_paragraph(f'  • Difference: {abs(optimal_yield - 26.70):.2f}%')
 # Model equation
 doc.add_page_break()
 doc.add_heading('6. Regression Model Equation', 1)
-doc.add_paragraph('Oil Yield (%) = ')
-equation_text = f'{model.coef_[0]:.4f}'
-for i, name in enumerate(feature_names[1:], 1):
-    coef = model.coef_[i]
-    sign = '+' if coef >= 0 else '-'
-    equation_text += f' {sign} {abs(coef):.4f}*{name}'
-
-# Add equation in parts (Word has character limits)
-for i in range(0, len(equation_text), 100):
-    doc.add_paragraph(equation_text[i:i+100])
+# Expanded equation, broken between terms rather than inside numbers
+for line in compiled_model.equation(width=100):
+    doc.add_paragraph(line)
+doc.add_paragraph('Nested (Horner) form used for prediction:')
+doc.add_paragraph(compiled_model.nested_equation())
+
+# Global sensitivity analysis
+doc.add_page_break()
+doc.add_heading('7. Global Sensitivity Analysis (Sobol Indices)', 1)
+sobol_table = sobol_indices(compiled_model, 4)
+doc.add_paragraph(
+    'First-order (S1) and total (ST) Sobol indices of each factor over the coded region '
+    '[-2, 2], estimated by Saltelli sampling of the fitted surface with 95% bootstrap '
+    'confidence intervals. ST - S1 is the share of variance due to interactions.'
+)
+sobol_doc_table = doc.add_table(rows=1, cols=5)
+sobol_doc_table.style = 'Light Grid Accent 1'
+for i, header in enumerate(['Rank', 'Factor', 'S1 (95% CI)', 'ST (95% CI)', 'Interaction']):
+    sobol_doc_table.rows[0].cells[i].text = header
+for idx, row in sobol_table.iterrows():
+    row_cells = sobol_doc_table.add_row().cells
+    row_cells[0].text = str(row['Rank'])
+    row_cells[1].text = labels[row['Factor']]
+    row_cells[2].text = f"{row['S1']:.3f} ({row['S1_low']:.3f}–{row['S1_high']:.3f})"
+    row_cells[3].text = f"{row['ST']:.3f} ({row['ST_low']:.3f}–{row['ST_high']:.3f})"
+    row_cells[4].text = f"{row['Interaction']:.3f}"
+
+# Gaussian-process surrogate comparison
+doc.add_heading('8. Gaussian-Process Surrogate Comparison', 1)
+gp_model, gp_rows = compare_with_quadratic(X_coded.astype(float), y)
+doc.add_paragraph(
+    'A Gaussian-process (kriging) surrogate with anisotropic squared-exponential kernel was '
+    'fitted to the same coded design, with hyperparameters tuned by marginal likelihood. '
+    'Predicted R² is computed from closed-form leave-one-out residuals for both models.'
+)
+gp_table = doc.add_table(rows=1, cols=4)
+gp_table.style = 'Light Grid Accent 1'
+for i, header in enumerate(['Model', 'R-squared', 'PRESS', 'Predicted R-squared']):
+    gp_table.rows[0].cells[i].text = header
+for gp_row in gp_rows:
+    row_cells = gp_table.add_row().cells
+    row_cells[0].text = gp_row['Model']
+    row_cells[1].text = f"{gp_row['R2']:.4f}"
+    row_cells[2].text = f"{gp_row['PRESS']:.4f}"
+    row_cells[3].text = f"{gp_row['Pred_R2']:.4f}"
 
 # Save document
 doc.save('Jatropha_Oil_Extraction_Analysis.docx')
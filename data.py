@@ -7,6 +7,8 @@ from mpl_toolkits.mplot3d import Axes3D
 from docx import Document
 from docx.shared import Inches
 import os # To handle temporary image files
+from rsm import design_matrix, prediction_bands, quadratic_terms
+from rsm_compile import compile_polynomial
 
 # --- 1. Data Extraction and Preparation ---
 # Data extracted from Source 50: Table 4.1
@@ -41,39 +43,15 @@ results = model.fit()
 # Extract coefficients for the optimization function
 coefficients = results.params
 
-# Function to predict yield using the fitted model (coded values)
-def predict_yield_coded(X1, X2, X3, X4, coeffs):
-    # Intercept (B0)
-    Y_pred = coeffs['Intercept']
-
-    # Linear terms (Bi*Xi)
-    Y_pred += coeffs['X1'] * X1
-    Y_pred += coeffs['X2'] * X2
-    Y_pred += coeffs['X3'] * X3
-    Y_pred += coeffs['X4'] * X4
-
-    # Quadratic terms (Bii*Xi^2)
-    Y_pred += coeffs['I(X1 ** 2)'] * (X1**2)
-    Y_pred += coeffs['I(X2 ** 2)'] * (X2**2)
-    Y_pred += coeffs['I(X3 ** 2)'] * (X3**2)
-    Y_pred += coeffs['I(X4 ** 2)'] * (X4**2)
-
-    # Interaction terms (Bij*Xi*Xj)
-    Y_pred += coeffs['X1:X2'] * X1 * X2
-    Y_pred += coeffs['X1:X3'] * X1 * X3
-    Y_pred += coeffs['X1:X4'] * X1 * X4
-    Y_pred += coeffs['X2:X3'] * X2 * X3
-    Y_pred += coeffs['X2:X4'] * X2 * X4
-    Y_pred += coeffs['X3:X4'] * X3 * X4
-
-    return Y_pred
+# Compiled prediction function (coded values); the formula terms follow the
+# same order as rsm.quadratic_terms
+predict_yield_coded = compile_polynomial(coefficients.values, quadratic_terms(4))
 
 # --- 3. Optimization to Maximize Predicted Oil Yield ---
 
 # Function to minimize (negative of the predicted oil yield)
 def predicted_yield_neg(X):
-    X1, X2, X3, X4 = X
-    return -predict_yield_coded(X1, X2, X3, X4, coefficients)
+    return -predict_yield_coded(X)
 
 # Constraints: -2 <= Xi <= 2 for all factors
 bounds = [(-2, 2), (-2, 2), (-2, 2), (-2, 2)]
@@ -120,8 +98,9 @@ def get_actual_label(code):
 
 def generate_rsm_plots(X_var_code, Y_var_code, fixed_var_codes, coeffs):
     """
-    Generates a 2D contour plot and a 3D surface plot for two varying factors,
-    while fixing the other two at their center point (0).
+    Generates a 2D contour plot, a 3D surface plot and standard-error /
+    prediction-interval maps for two varying factors, while fixing the other
+    two at their center point (0).
     Saves plots as temporary image files.
     """
     
@@ -130,23 +109,16 @@ def generate_rsm_plots(X_var_code, Y_var_code, fixed_var_codes, coeffs):
     y_range = np.linspace(-2, 2, 50)
     X, Y = np.meshgrid(x_range, y_range)
     
-    Z = np.zeros_like(X)
-    
-    # Map for coded variable names
-    var_map = {'X1': 0, 'X2': 0, 'X3': 0, 'X4': 0}
-
-    # Calculate predicted yield (Z) for the grid
-    for i in range(X.shape[0]):
-        for j in range(X.shape[1]):
-            
-            # Reset and map the grid values to the correct coded factor
-            temp_map = var_map.copy()
-            temp_map[X_var_code] = X[i, j]
-            temp_map[Y_var_code] = Y[i, j]
-            
-            # The other two factors remain at 0 (fixed)
-            
-            Z[i, j] = predict_yield_coded(temp_map['X1'], temp_map['X2'], temp_map['X3'], temp_map['X4'], coeffs)
+    # Whole grid as one design matrix (the other two factors fixed at 0).
+    # rsm.design_matrix uses the same column order as rsm_formula.
+    grid_coded = np.zeros((X.size, 4))
+    grid_coded[:, int(X_var_code[1]) - 1] = X.ravel()
+    grid_coded[:, int(Y_var_code[1]) - 1] = Y.ravel()
+    bands = prediction_bands(design_matrix(grid_coded), coeffs.values,
+                             results.normalized_cov_params, results.scale, results.df_resid)
+    Z = bands['mean'].reshape(X.shape)
+    SE = bands['se_mean'].reshape(X.shape)
+    PI_half = ((bands['pi_high'] - bands['pi_low']) / 2).reshape(X.shape)
 
     x_label_actual = get_actual_label(X_var_code)
     y_label_actual = get_actual_label(Y_var_code)
@@ -175,8 +147,22 @@ def generate_rsm_plots(X_var_code, Y_var_code, fixed_var_codes, coeffs):
     plot_3d_filename = f'surface_{X_var_code}_{Y_var_code}.png'
     fig_3d.savefig(plot_3d_filename, dpi=300)
     plt.close(fig_3d)
+
+    # Uncertainty maps
+    fig_u, axes = plt.subplots(1, 2, figsize=(14, 6))
+    for ax_u, surface, label in [(axes[0], SE, 'Standard Error of Predicted Mean (%)'),
+                                 (axes[1], PI_half, '95% Prediction Interval Half-width (%)')]:
+        cs = ax_u.contourf(X, Y, surface, cmap='magma', levels=20)
+        fig_u.colorbar(cs, ax=ax_u, label=label)
+        ax_u.set_xlabel(f'{x_label_actual} ({X_var_code} Coded)')
+        ax_u.set_ylabel(f'{y_label_actual} ({Y_var_code} Coded)')
+        ax_u.set_title(label)
+    fig_u.suptitle(f'Prediction Uncertainty: {X_var_code} vs {Y_var_code}' + title_suffix)
+    plot_u_filename = f'uncertainty_{X_var_code}_{Y_var_code}.png'
+    fig_u.savefig(plot_u_filename, dpi=300)
+    plt.close(fig_u)
     
-    return plot_2d_filename, plot_3d_filename
+    return plot_2d_filename, plot_3d_filename, plot_u_filename
 
 # Factor combinations to plot (fixing the other two at center point 0)
 plot_combinations = [
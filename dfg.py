@@ -14,6 +14,7 @@ from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import io
 from datetime import datetime
+from drying_threshold import crossing_times
 
 def prepare_data():
     """Prepare experimental data for analysis"""
@@ -44,9 +45,10 @@ def statistical_analysis(data):
     lower_time_hrs = np.array(data['lower']['time']) / 60
     open_time_hrs = np.array(data['open']['time']) / 60
     
-    upper_drying_time = next((t for t, mc in zip(upper_time_hrs, data['upper']['mc']) if mc <= 10), None)
-    lower_drying_time = next((t for t, mc in zip(lower_time_hrs, data['lower']['mc']) if mc <= 10), None)
-    open_drying_time = next((t for t, mc in zip(open_time_hrs, data['open']['mc']) if mc <= 10), None)
+    # Interpolated time to safe moisture (10% w.b.) for all chambers at once
+    upper_drying_time, lower_drying_time, open_drying_time = crossing_times(
+        [upper_time_hrs, lower_time_hrs, open_time_hrs],
+        [data['upper']['mc'], data['lower']['mc'], data['open']['mc']], [10.0])[:, 0]
     
     results['drying_times'] = {'upper': upper_drying_time, 'lower': lower_drying_time, 'open': open_drying_time}
     results['avg_drying_rates'] = {
@@ -0,0 +1,86 @@
+"""
+Shared helpers for the cylindrical solar dryer study (crayfish, upper and
+lower trays against open-air drying).
+
+abaspaper.py, abj.py, dfg.py and claudClaude.pclaude.py each carry their own
+copy of the Appendix B drying curves. The helpers here keep one copy (the
+version in dfg.py, which also has tray temperatures and logged drying
+rates) and the moisture conversions the drying analysis modules share.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Time (min), moisture content (% w.b.), tray temperature (°C) and logged
+# drying rate (g H2O/min) per chamber, from dfg.py prepare_data()
+TRAYS = {
+    'upper': {
+        'time': [0, 60, 120, 180, 240, 300, 360, 420, 540, 600, 660, 720, 780, 840],
+        'mc': [67.00, 64.00, 63.00, 60.00, 56.00, 45.00, 37.00, 36.00, 21.00, 16.00, 11.00, 7.00, 3.00, 0.00],
+        'temp': [30.00, 30.00, 44.00, 35.00, 37.00, 45.00, 37.00, 28.00, 32.30, 43.40, 34.70, 34.00, 40.00, 43.00],
+        'rate': [0.000, 0.055, 0.047, 0.054, 0.061, 0.081, 0.081, 0.073, 0.070, 0.065, 0.061, 0.057, 0.053, 0.051]
+    },
+    'lower': {
+        'time': [0, 60, 120, 180, 240, 300, 360, 420, 480, 540, 600, 660, 720, 780, 840, 900, 960, 1020],
+        'mc': [68.00, 69.00, 65.00, 60.00, 55.00, 51.00, 43.00, 40.00, 38.00, 30.00, 25.00, 22.00, 18.00, 14.00, 10.00, 7.00, 3.00, 0.00],
+        'temp': [32.00, 34.00, 48.00, 37.00, 41.00, 41.00, 41.00, 28.00, 37.80, 38.60, 50.30, 37.00, 31.20, 41.00, 31.70, 40.00, 50.00, 54.00],
+        'rate': [0.000, 0.032, 0.033, 0.061, 0.068, 0.068, 0.071, 0.066, 0.064, 0.060, 0.056, 0.052, 0.049, 0.047, 0.045, 0.043, 0.041, 0.039]
+    },
+    'open': {
+        'time': [0, 60, 120, 180, 240, 300, 360, 420, 480, 540, 600, 660, 720, 780, 840, 900, 960, 1020, 1080, 1140, 1200],
+        'mc': [52.00, 50.00, 49.00, 47.00, 46.00, 45.00, 44.00, 42.00, 31.00, 26.00, 24.00, 22.00, 19.00, 16.00, 13.00, 9.00, 7.00, 3.00, 3.00, 0.00, 0.00],
+        'rate': [0, 0.033, 0.025, 0.022, 0.020, 0.020, 0.019, 0.016, 0.027, 0.028, 0.027, 0.026, 0.023, 0.023, 0.022, 0.025, 0.023, 0.023, 0.021, 0.021, 0.000]
+    }
+}
+
+LABELS = {'upper': 'Upper Chamber', 'lower': 'Lower Chamber', 'open': 'Open Air Drying'}
+
+
+def load_tray(name):
+    """One tray's curve as a DataFrame (temp is NaN for open-air drying)"""
+    tray = TRAYS[name]
+    df = pd.DataFrame({'time': tray['time'], 'mc': tray['mc'], 'rate': tray['rate']})
+    df['temp'] = tray.get('temp', np.nan)
+    return df
+
+
+def dry_basis(mc_wb):
+    """Moisture content % wet basis -> kg water per kg dry matter"""
+    mc_wb = np.asarray(mc_wb, dtype=float)
+    return mc_wb / (100.0 - mc_wb)
+
+
+def moisture_ratio(mc_wb, me_wb=0.0, axis=-1):
+    """
+    Moisture ratio MR = (M - Me) / (M0 - Me) on a dry basis, with M0 the
+    first sample along axis and Me the equilibrium moisture content.
+    """
+    m = dry_basis(mc_wb)
+    me = dry_basis(me_wb)
+    m0 = np.take(m, [0], axis=axis)
+    return (m - me) / (m0 - me)
+
+
+def mass_to_mc(mass, dry_mass):
+    """Moisture content % wet basis from sample mass and its dry-matter mass"""
+    mass = np.asarray(mass, dtype=float)
+    return (mass - dry_mass) / mass * 100.0
+
+
+# The Appendix B curves as typed in abaspaper.py/abj.py: different grids from
+# TRAYS (upper ends at 780 min, lower has a 1140 min sample after 1020,
+# open air skips 420 min)
+APPENDIX_B = {
+    'upper': {
+        'time': [0, 60, 120, 180, 240, 300, 360, 420, 480, 540, 600, 660, 720, 780],
+        'mc': [67, 64, 63, 60, 56, 45, 37, 36, 21, 16, 11, 7, 3, 0]
+    },
+    'lower': {
+        'time': [0, 60, 120, 180, 240, 300, 360, 420, 480, 540, 600, 660, 720, 780, 840, 900, 960, 1020, 1140],
+        'mc': [68, 69, 65, 60, 55, 51, 43, 40, 38, 30, 25, 22, 18, 14, 10, 7, 3, 0, 0]
+    },
+    'open': {
+        'time': [0, 60, 120, 180, 240, 300, 360, 480, 540, 600, 660, 720, 780, 840, 900, 960, 1020, 1080, 1140, 1200],
+        'mc': [52, 50, 49, 47, 46, 45, 44, 42, 31, 26, 24, 22, 19, 16, 13, 9, 7, 3, 3, 0]
+    }
+}
@@ -0,0 +1,205 @@
+"""
+Effective moisture diffusivity from the full Fick series, and activation
+energy from many trials at several temperatures.
+
+jan.py estimates D_eff from the slope of ln(MR) against time with the first
+series term only, no intercept correction and an assumed 1 cm half-thickness,
+and its Arrhenius figure uses made-up rate constants. Here the solution of
+Fick's second law for constant D and a uniform initial moisture,
+
+    MR(t) = sum_k a_k exp(-lambda_k D t / L^2)
+
+is evaluated with all its terms as one (curves x samples x terms) array for
+an infinite slab (L = half-thickness), an infinite cylinder or a sphere
+(L = radius):
+
+    slab      a_k = 8 / ((2k-1)^2 pi^2)    lambda_k = (2k-1)^2 pi^2 / 4
+    cylinder  a_k = 4 / beta_k^2           lambda_k = beta_k^2  (J0(beta_k) = 0)
+    sphere    a_k = 6 / (k^2 pi^2)         lambda_k = k^2 pi^2
+
+fit_diffusivity fits ln D for every curve of a batch with a damped
+Gauss–Newton loop started from the first-term (slope) estimate, and
+fit_arrhenius fits ln D = ln D0 - Ea / (R T) for every trial at once from
+masked sums, so unequal numbers of temperature levels are allowed.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.special import jn_zeros
+
+from drying import TRAYS, LABELS, moisture_ratio
+from drying_models import pad_curves, goodness_of_fit
+
+R_GAS = 8.314  # J/(mol K)
+GEOMETRIES = ('slab', 'cylinder', 'sphere')
+
+
+def series_terms(geometry='slab', n_terms=50):
+    """Coefficients a_k and eigenvalues lambda_k of the Fick series"""
+    k = np.arange(1, n_terms + 1, dtype=float)
+    if geometry == 'slab':
+        lam = ((2 * k - 1) * np.pi / 2) ** 2
+        return 2 / lam, lam
+    if geometry == 'cylinder':
+        lam = jn_zeros(0, n_terms) ** 2
+        return 4 / lam, lam
+    if geometry == 'sphere':
+        lam = (k * np.pi) ** 2
+        return 6 / lam, lam
+    raise ValueError(f"geometry must be one of {GEOMETRIES}")
+
+
+def fick_mr(fo, geometry='slab', n_terms=50):
+    """
+    Moisture ratio at Fourier number fo = D t / L^2 (any shape) and its
+    derivative with respect to ln D.
+    """
+    a, lam = series_terms(geometry, n_terms)
+    fo = np.asarray(fo, dtype=float)
+    e = a * np.exp(-fo[..., None] * lam)
+    return e.sum(axis=-1), -fo * (lam * e).sum(axis=-1)
+
+
+def slope_diffusivity(T, Y, W, L, geometry='slab', floor=0.02):
+    """
+    First-term estimate per curve: least-squares slope of ln MR - ln a_1
+    against t (through the origin), D = -slope L^2 / lambda_1.
+    """
+    a, lam = series_terms(geometry, 1)
+    use = W * (Y > floor)
+    z = np.log(np.clip(Y, floor, None)) - np.log(a[0])
+    slope = np.sum(use * T * z, axis=1) / np.maximum(np.sum(use * T ** 2, axis=1), 1e-300)
+    return np.clip(-slope, 1e-300, None) * L ** 2 / lam[0]
+
+
+def fit_diffusivity(curves, L, geometry='slab', n_terms=50, max_iter=100, tol=1e-12):
+    """
+    Fit D_eff (m²/s) to every (time in s, MR) curve; L is the half-thickness
+    or radius in m (a scalar or one value per curve). Returns a DataFrame with
+    D_eff, the first-term estimate, R², RMSE, χ² and a convergence flag
+    (False for curves where the damping blew up before convergence).
+    """
+    T, Y, W = pad_curves(curves)
+    L = np.broadcast_to(np.asarray(L, dtype=float), (len(curves),))
+    scale = (1 / L ** 2)[:, None]
+    D_slope = slope_diffusivity(T, Y, W, L, geometry)
+    theta = np.log(D_slope)
+
+    f, J = fick_mr(np.exp(theta)[:, None] * T * scale, geometry, n_terms)
+    r = (f - Y) * W
+    sse = np.sum(r ** 2, axis=1)
+    lam = np.full(len(curves), 1e-3)
+    converged = np.zeros(len(curves), dtype=bool)
+    stalled = np.zeros(len(curves), dtype=bool)
+    for _ in range(max_iter):
+        done = converged | stalled
+        jtj = np.sum(W * J * J, axis=1)
+        step = -np.sum(W * J * r, axis=1) / (jtj * (1 + lam) + 1e-300)
+        step[done] = 0.0
+        theta_new = theta + step
+        f_new, J_new = fick_mr(np.exp(theta_new)[:, None] * T * scale, geometry, n_terms)
+        r_new = (f_new - Y) * W
+        sse_new = np.sum(r_new ** 2, axis=1)
+        better = (sse_new < sse) & ~done
+        small = (sse - np.where(better, sse_new, sse)) <= tol * (1 + sse)
+        theta[better] = theta_new[better]
+        f[better], J[better], r[better] = f_new[better], J_new[better], r_new[better]
+        converged |= better & small
+        sse = np.where(better, sse_new, sse)
+        lam = np.where(better, lam / 3, np.minimum(lam * 4, 1e12))
+        # no step accepted even with maximal damping: stop, but not converged
+        stalled |= (lam >= 1e12) & ~converged
+        if (converged | stalled).all():
+            break
+
+    r2, rmse, chi2 = goodness_of_fit(Y, W, sse, 1)
+    return pd.DataFrame({'D_eff': np.exp(theta), 'D_slope': D_slope, 'R2': r2,
+                         'RMSE': rmse, 'Chi2': chi2, 'Converged': converged})
+
+
+def fit_arrhenius(temp_c, D):
+    """
+    Fit ln D = ln D0 - Ea / (R T) for every row of (trials x levels) arrays
+    of temperature (°C) and diffusivity; NaN marks a missing level. Returns
+    Ea (kJ/mol), its standard error, D0 (m²/s), R² and the number of levels.
+    """
+    x = 1 / (np.asarray(temp_c, dtype=float) + 273.15)
+    y = np.log(np.asarray(D, dtype=float))
+    w = np.isfinite(x) & np.isfinite(y)
+    x, y = np.where(w, x, 0.0), np.where(w, y, 0.0)
+    n = w.sum(axis=1)
+    xm = x.sum(axis=1) / n
+    ym = y.sum(axis=1) / n
+    dx = np.where(w, x - xm[:, None], 0.0)
+    dy = np.where(w, y - ym[:, None], 0.0)
+    sxx = np.sum(dx ** 2, axis=1)
+    slope = np.sum(dx * dy, axis=1) / sxx
+    sse = np.sum((dy - slope[:, None] * dx) ** 2, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se = np.sqrt(sse / (n - 2) / sxx)
+        r2 = 1 - sse / np.sum(dy ** 2, axis=1)
+    return pd.DataFrame({'Ea_kJ_mol': -slope * R_GAS / 1000, 'Ea_se': se * R_GAS / 1000,
+                         'D0': np.exp(ym - slope * xm), 'R2': r2, 'Levels': n})
+
+
+def arrhenius_from_curves(curves, temp_c, trial, L, geometry='slab', n_terms=50):
+    """
+    D_eff for every curve and then Ea for every trial: temp_c and trial give
+    each curve's temperature level and trial id. Returns (per-curve fits,
+    per-trial Arrhenius table indexed by trial id).
+    """
+    fits = fit_diffusivity(curves, L, geometry, n_terms)
+    fits['Trial'] = trial
+    fits['Temp'] = temp_c
+    ids, row = np.unique(np.asarray(trial), return_inverse=True)
+    temps, col = np.unique(np.asarray(temp_c, dtype=float), return_inverse=True)
+    grid_D = np.full((len(ids), len(temps)), np.nan)
+    grid_D[row, col] = fits['D_eff'].to_numpy()
+    table = fit_arrhenius(np.broadcast_to(temps, grid_D.shape), grid_D)
+    table.index = pd.Index(ids, name='Trial')
+    return fits, table
+
+
+def simulate_trials(n_trials, temps=(40, 50, 60, 70), Ea=30e3, D0=2e-4, L=0.005,
+                    geometry='slab', seed=0, noise=0.01):
+    """Synthetic MR curves for n_trials trials, one per temperature level"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(0, 13) * 3600.0
+    curves, trial, level = [], [], []
+    for i in range(n_trials):
+        d0 = D0 * rng.lognormal(0, 0.2)
+        for temp in temps:
+            D = d0 * np.exp(-Ea / (R_GAS * (temp + 273.15)))
+            mr = fick_mr(D * t / L ** 2, geometry)[0] + rng.normal(0, noise, len(t))
+            curves.append((t, mr))
+            trial.append(i)
+            level.append(temp)
+    return curves, np.array(trial), np.array(level, dtype=float)
+
+
+def main():
+    """Tray curves for each geometry, then activation energy for simulated trials"""
+    L = 0.005  # assumed 5 mm half-thickness/radius of the crayfish
+    curves = [(np.asarray(t['time'], dtype=float) * 60, moisture_ratio(t['mc']))
+              for t in TRAYS.values()]
+    pd.set_option('display.width', 200)
+    for geometry in GEOMETRIES:
+        res = fit_diffusivity(curves, L, geometry)
+        res.index = [LABELS[k] for k in TRAYS]
+        print(f"{geometry}:")
+        print(res.to_string(float_format='%.4g'))
+        print()
+
+    n = 2_000
+    curves, trial, level = simulate_trials(n)
+    t0 = time.perf_counter()
+    _, arr = arrhenius_from_curves(curves, level, trial, L)
+    elapsed = time.perf_counter() - t0
+    print(f"{len(curves):,} curves and {n:,} Arrhenius fits in {elapsed:.2f} s (true Ea 30 kJ/mol)")
+    print(arr.describe().loc[['mean', 'std', 'min', 'max']].to_string(float_format='%.4g'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Thin-layer drying models fitted to many moisture-ratio curves at once.
+
+abaspaper.py, abj.py and dfg.py only plot the tray curves. Here the six
+usual thin-layer models are fitted to moisture ratio MR(t):
+
+    Lewis              MR = exp(-k t)
+    Page               MR = exp(-k t^n)
+    Henderson–Pabis    MR = a exp(-k t)
+    Logarithmic        MR = a exp(-k t) + c
+    Two-term           MR = a exp(-k0 t) + b exp(-k1 t)
+    Midilli            MR = a exp(-k t^n) + b t
+
+Curves of different length are padded into one (curves x samples) array
+with a weight mask. Each model is fitted to the whole batch by a
+Levenberg–Marquardt loop whose residuals, analytic Jacobians (curves x
+samples x params) and damped normal equations are all batched, with a
+separate damping factor per curve. Models with two exponentials are
+started from several parameter sets (equal rates are the Henderson–Pabis
+solution, a stationary point the loop would not leave) and the best fit
+is kept. Groups of curves are farmed out to worker processes. The ranking
+table compares R², RMSE and reduced χ² for every model over all curves.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from drying import TRAYS, LABELS, moisture_ratio
+
+
+def _lewis(t, P):
+    e = np.exp(-P[:, 0:1] * t)
+    return e, np.stack([-t * e], axis=-1)
+
+
+def _tn(t, n):
+    g = t ** n
+    log_t = np.log(np.where(t > 0, t, 1.0))
+    return g, g * log_t
+
+
+def _page(t, P):
+    k, n = P[:, 0:1], P[:, 1:2]
+    g, g_log = _tn(t, n)
+    e = np.exp(-k * g)
+    return e, np.stack([-g * e, -k * g_log * e], axis=-1)
+
+
+def _henderson_pabis(t, P):
+    a, k = P[:, 0:1], P[:, 1:2]
+    e = np.exp(-k * t)
+    return a * e, np.stack([e, -a * t * e], axis=-1)
+
+
+def _logarithmic(t, P):
+    a, k, c = P[:, 0:1], P[:, 1:2], P[:, 2:3]
+    e = np.exp(-k * t)
+    return a * e + c, np.stack([e, -a * t * e, np.ones_like(e)], axis=-1)
+
+
+def _two_term(t, P):
+    a, k0, b, k1 = P[:, 0:1], P[:, 1:2], P[:, 2:3], P[:, 3:4]
+    e0 = np.exp(-k0 * t)
+    e1 = np.exp(-k1 * t)
+    return a * e0 + b * e1, np.stack([e0, -a * t * e0, e1, -b * t * e1], axis=-1)
+
+
+def _midilli(t, P):
+    a, k, n, b = P[:, 0:1], P[:, 1:2], P[:, 2:3], P[:, 3:4]
+    g, g_log = _tn(t, n)
+    e = np.exp(-k * g)
+    return a * e + b * t, np.stack([e, -a * g * e, -a * k * g_log * e, t * np.ones_like(e)], axis=-1)
+
+
+# name -> (parameter names, batched model function, initial guess(es) from k0)
+MODELS = {
+    'Lewis': (['k'], _lewis, lambda k0: [k0]),
+    'Page': (['k', 'n'], _page, lambda k0: [k0, 1.0]),
+    'Henderson-Pabis': (['a', 'k'], _henderson_pabis, lambda k0: [1.0, k0]),
+    'Logarithmic': (['a', 'k', 'c'], _logarithmic, lambda k0: [1.0, k0, 0.0]),
+    'Two-term': (['a', 'k0', 'b', 'k1'], _two_term,
+                 lambda k0: [[0.9, k0, 0.1, 10 * k0], [0.7, 0.5 * k0, 0.3, 3 * k0],
+                             [0.5, 2 * k0, 0.5, 0.5 * k0]]),
+    'Midilli': (['a', 'k', 'n', 'b'], _midilli, lambda k0: [1.0, k0, 1.0, 0.0])
+}
+
+
+def pad_curves(curves):
+    """
+    Stack (time, MR) pairs of unequal length into (B x m) arrays plus a
+    0/1 weight mask; padded samples repeat the last time and carry no weight.
+    """
+    m = max(len(t) for t, _ in curves)
+    T = np.zeros((len(curves), m))
+    Y = np.zeros((len(curves), m))
+    W = np.zeros((len(curves), m))
+    for i, (t, y) in enumerate(curves):
+        n = len(t)
+        T[i, :n], T[i, n:] = t, t[-1]
+        Y[i, :n] = y
+        W[i, :n] = 1.0
+    return T, Y, W
+
+
+def initial_rate(T, Y, W, floor=0.02):
+    """Log-linear estimate of k for every curve (samples with MR > floor)"""
+    use = W * (Y > floor) * (T > 0)
+    log_y = np.log(np.clip(Y, floor, None))
+    # least-squares slope of ln MR through the origin
+    k0 = -np.sum(use * T * log_y, axis=1) / np.maximum(np.sum(use * T ** 2, axis=1), 1e-12)
+    return np.clip(k0, 1e-6, None)
+
+
+def _levenberg_marquardt(fn, T, Y, W, P, max_iter, tol):
+    """Batched LM from starting parameters P; returns P, SSE and a convergence flag"""
+    f, J = fn(T, P)
+    r = (f - Y) * W
+    sse = np.sum(r ** 2, axis=1)
+    lam = np.full(len(P), 1e-3)
+    converged = np.zeros(len(P), dtype=bool)
+    stalled = np.zeros(len(P), dtype=bool)
+    eye = np.eye(P.shape[1])
+    for _ in range(max_iter):
+        done = converged | stalled
+        JW = J * W[..., None]
+        JtJ = np.einsum('bmi,bmj->bij', JW, J)
+        g = np.einsum('bmi,bm->bi', JW, r)
+        diag = np.einsum('bii->bi', JtJ)
+        A = JtJ + lam[:, None, None] * (diag[:, :, None] * eye + 1e-12 * eye)
+        delta = -np.linalg.solve(A, g[..., None])[..., 0]
+        delta[done] = 0.0
+        P_new = P + delta
+        with np.errstate(over='ignore', invalid='ignore', divide='ignore'):
+            f_new, J_new = fn(T, P_new)
+            r_new = (f_new - Y) * W
+            sse_new = np.sum(r_new ** 2, axis=1)
+        better = np.isfinite(sse_new) & (sse_new < sse) & ~done
+        small = (sse - np.where(better, sse_new, sse)) <= tol * (1 + sse)
+        P[better] = P_new[better]
+        f[better], J[better], r[better] = f_new[better], J_new[better], r_new[better]
+        # converged once an accepted step no longer improves the fit
+        converged |= better & small
+        sse = np.where(better, sse_new, sse)
+        lam = np.where(better, lam / 3, np.minimum(lam * 4, 1e12))
+        # no step accepted even with maximal damping: stop, but not converged
+        stalled |= (lam >= 1e12) & ~converged
+        if (converged | stalled).all():
+            break
+    return P, sse, converged
+
+
+def fit_batch(model, T, Y, W, max_iter=300, tol=1e-12):
+    """
+    Levenberg–Marquardt fit of one model to every curve of the batch, from
+    each of the model's starting guesses, keeping the lowest SSE.
+    Returns parameters (B x p), weighted SSE per curve and a convergence
+    flag (False where the damping blew up before the fit converged).
+    """
+    names, fn, init = MODELS[model]
+    k0 = initial_rate(T, Y, W)
+    starts = np.array([np.atleast_2d(np.asarray(init(k), dtype=float)) for k in k0])
+    B, S, p = starts.shape
+    P, sse, converged = _levenberg_marquardt(
+        fn, np.repeat(T, S, axis=0), np.repeat(Y, S, axis=0), np.repeat(W, S, axis=0),
+        starts.reshape(B * S, p), max_iter, tol)
+    sse = np.where(np.isfinite(sse), sse, np.inf).reshape(B, S)
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(B) * S + best
+    return P[rows], sse[np.arange(B), best], converged[rows]
+
+
+def goodness_of_fit(Y, W, sse, n_params):
+    """R², RMSE and reduced χ² (SSE / (N - p)) per curve"""
+    n = W.sum(axis=1)
+    mean = np.sum(W * Y, axis=1) / n
+    sst = np.sum(W * (Y - mean[:, None]) ** 2, axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        chi2 = sse / (n - n_params)
+    return 1 - sse / sst, np.sqrt(sse / n), chi2
+
+
+def _fit_group(task):
+    """All models on one group of curves (runs in a worker)"""
+    T, Y, W, models = task
+    out = {}
+    for model in models:
+        P, sse, done = fit_batch(model, T, Y, W)
+        out[model] = (P, sse, done, goodness_of_fit(Y, W, sse, P.shape[1]))
+    return out
+
+
+def fit_curves(curves, names=None, models=None, n_jobs=None):
+    """
+    Fit every model to every (time, MR) curve. Returns a long DataFrame with
+    one row per curve and model: parameters, R², RMSE, χ², convergence and
+    the model's rank within the curve (by RMSE).
+    """
+    models = models or list(MODELS)
+    names = names or [f'curve_{i}' for i in range(len(curves))]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    T, Y, W = pad_curves(curves)
+    splits = np.array_split(np.arange(len(curves)), min(n_jobs, len(curves)))
+    tasks = [(T[s], Y[s], W[s], models) for s in splits]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_fit_group, tasks))
+    else:
+        results = [_fit_group(t) for t in tasks]
+
+    rows = []
+    for s, res in zip(splits, results):
+        for model, (P, sse, done, (r2, rmse, chi2)) in res.items():
+            for j, i in enumerate(s):
+                row = {'Curve': names[i], 'Model': model, 'R2': r2[j], 'RMSE': rmse[j],
+                       'Chi2': chi2[j], 'Converged': bool(done[j])}
+                row.update(dict(zip(MODELS[model][0], P[j])))
+                rows.append(row)
+    table = pd.DataFrame(rows)
+    table['Rank'] = table.groupby('Curve')['RMSE'].rank(method='min').astype(int)
+    return table
+
+
+def rank_models(table):
+    """Model comparison over all curves: mean statistics, mean rank and wins"""
+    summary = table.groupby('Model').agg(
+        R2=('R2', 'mean'), RMSE=('RMSE', 'mean'), Chi2=('Chi2', 'mean'),
+        Mean_Rank=('Rank', 'mean'), Wins=('Rank', lambda r: int(np.sum(r == 1))))
+    return summary.sort_values(['Mean_Rank', 'RMSE']).reset_index()
+
+
+def tray_curves():
+    """(time in min, MR) for the upper, lower and open-air trays"""
+    return {name: (np.asarray(t['time'], dtype=float), moisture_ratio(t['mc']))
+            for name, t in TRAYS.items()}
+
+
+def simulate_trials(n, seed=0, noise=0.01):
+    """Synthetic Page-model drying runs of random length, for batch timing"""
+    rng = np.random.default_rng(seed)
+    curves = []
+    for _ in range(n):
+        m = rng.integers(12, 25)
+        t = np.arange(m) * 60.0
+        k = rng.uniform(1e-4, 2e-3)
+        nn = rng.uniform(0.9, 1.6)
+        curves.append((t, np.exp(-k * t ** nn) + rng.normal(0, noise, m)))
+    return curves
+
+
+def main():
+    """Fit the three trays, then a batch of synthetic trials"""
+    trays = tray_curves()
+    table = fit_curves(list(trays.values()), [LABELS[k] for k in trays], n_jobs=1)
+    pd.set_option('display.width', 200)
+    cols = ['Curve', 'Model', 'Rank', 'R2', 'RMSE', 'Chi2', 'k', 'n', 'a', 'b', 'c', 'k0', 'k1']
+    print(table.sort_values(['Curve', 'Rank'])[cols].to_string(index=False, float_format='%.4g'))
+    print()
+    print(rank_models(table).to_string(index=False, float_format='%.4g'))
+
+    trials = simulate_trials(500)
+    t0 = time.perf_counter()
+    big = fit_curves(trials)
+    print(f"\nFitted {len(MODELS)} models to {len(trials)} trials in "
+          f"{time.perf_counter() - t0:.2f} s ({big['Converged'].mean():.1%} converged)")
+    print(rank_models(big).to_string(index=False, float_format='%.4g'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Common-time-grid resampling for drying curves of unequal length.
+
+The chambers in abaspaper.py have 14, 19 and 20 samples on different time
+vectors, and dfg.py uses yet another set of grids, so rates, averages and
+ANOVA across chambers are only comparable after alignment. resample_curves
+cleans every curve with explicit, reported rules and interpolates all of
+them onto one shared grid in a single batched step:
+
+* time and value vectors of different length: the extra samples are
+  dropped from the longer one (policy='truncate') or an error is raised
+  (policy='strict');
+* missing values (NaN) are dropped; unsorted times are sorted; repeated
+  times are averaged;
+* grid points outside a curve's sampled range are NaN, or hold the last
+  value after the end (outside='hold', for curves that have finished
+  drying);
+* interpolation is linear or monotone PCHIP (Fritsch–Carlson slopes, so a
+  drying curve never overshoots its samples). The interval containing each
+  grid point is found for every curve with one searchsorted.
+
+The result is a DataFrame indexed by the grid with one column per curve,
+plus a per-curve report of what was changed.
+"""
+
+import numpy as np
+import pandas as pd
+
+from drying import APPENDIX_B, TRAYS, LABELS
+from drying_threshold import pad_flat, pchip_slopes
+
+
+def clean_curve(t, v, policy='truncate'):
+    """Sorted, de-duplicated, NaN-free (t, v) and a dict describing the fixes"""
+    t = np.asarray(t, dtype=float)
+    v = np.asarray(v, dtype=float)
+    issues = {'n_time': len(t), 'n_value': len(v), 'truncated': 0, 'dropped_nan': 0,
+              'reordered': False, 'merged_duplicates': 0}
+    if len(t) != len(v):
+        if policy == 'strict':
+            raise ValueError(f'{len(t)} times but {len(v)} values')
+        n = min(len(t), len(v))
+        issues['truncated'] = max(len(t), len(v)) - n
+        t, v = t[:n], v[:n]
+    ok = np.isfinite(t) & np.isfinite(v)
+    issues['dropped_nan'] = int(np.sum(~ok))
+    t, v = t[ok], v[ok]
+    if np.any(np.diff(t) < 0):
+        issues['reordered'] = True
+        order = np.argsort(t, kind='stable')
+        t, v = t[order], v[order]
+    uniq, inv = np.unique(t, return_inverse=True)
+    if len(uniq) < len(t):
+        issues['merged_duplicates'] = len(t) - len(uniq)
+        v = np.bincount(inv, weights=v) / np.bincount(inv)
+        t = uniq
+    return t, v, issues
+
+
+def common_grid(times, step, span='union'):
+    """Regular grid covering all curves ('union') or only their overlap ('intersection')"""
+    starts = [t[0] for t in times]
+    ends = [t[-1] for t in times]
+    lo, hi = (min(starts), max(ends)) if span == 'union' else (max(starts), min(ends))
+    return np.arange(lo, hi + step / 2, step)
+
+
+def interpolate_rows(T, V, grid, method='pchip', lengths=None):
+    """
+    Evaluate every row's interpolant of (T, V) at grid (rows must be
+    strictly increasing in T; lengths as in pchip_slopes). Returns a
+    (B x g) array; points outside a row's range are clamped to its end
+    values.
+    """
+    B, m = T.shape
+    # interval index of each grid point in each row, from one flat searchsorted
+    span = np.ptp(T) + np.ptp(grid) + 1.0
+    base = T[:, :1]
+    offset = 2 * span * np.arange(B)[:, None]
+    keys = (T - base + offset).ravel()
+    queries = (grid[None, :] - base + offset).ravel()
+    j = np.searchsorted(keys, queries, side='right').reshape(B, len(grid))
+    j = np.clip(j - np.arange(B)[:, None] * m, 1, m - 1)
+
+    rows = np.arange(B)[:, None]
+    t0, t1 = T[rows, j - 1], T[rows, j]
+    v0, v1 = V[rows, j - 1], V[rows, j]
+    h = t1 - t0
+    s = np.clip((grid[None, :] - t0) / h, 0.0, 1.0)
+    if method == 'linear':
+        return v0 + s * (v1 - v0)
+    if method != 'pchip':
+        raise ValueError("method must be 'linear' or 'pchip'")
+    D = pchip_slopes(T, V, lengths)
+    d0, d1 = D[rows, j - 1], D[rows, j]
+    h00 = (1 + 2 * s) * (1 - s) ** 2
+    h10 = s * (1 - s) ** 2
+    h01 = s ** 2 * (3 - 2 * s)
+    h11 = s ** 2 * (s - 1)
+    return h00 * v0 + h10 * h * d0 + h01 * v1 + h11 * h * d1
+
+
+def resample_curves(curves, names=None, grid=None, step=30.0, span='union', method='pchip',
+                    outside='nan', policy='truncate'):
+    """
+    Align curves (a list of (time, value) pairs) on one grid. Returns
+    (frame, report): frame is indexed by the grid with one column per curve,
+    report lists per curve the samples kept and each cleaning step applied.
+    """
+    names = names or [f'curve_{i}' for i in range(len(curves))]
+    cleaned, issues = [], []
+    for t, v in curves:
+        tc, vc, info = clean_curve(t, v, policy)
+        if len(tc) < 2:
+            raise ValueError('each curve needs at least two usable samples')
+        cleaned.append((tc, vc))
+        info['n_used'] = len(tc)
+        issues.append(info)
+    times = [t for t, _ in cleaned]
+    grid = np.asarray(grid, dtype=float) if grid is not None else common_grid(times, step, span)
+
+    T, V = pad_flat(times, [v for _, v in cleaned])
+    out = interpolate_rows(T, V, grid, method, [len(t) for t in times])
+    start = np.array([t[0] for t in times])[:, None]
+    end = np.array([t[-1] for t in times])[:, None]
+    out = np.where(grid[None, :] < start, np.nan, out)
+    if outside == 'hold':
+        last = np.array([v[-1] for _, v in cleaned])[:, None]
+        out = np.where(grid[None, :] > end, last, out)
+    else:
+        out = np.where(grid[None, :] > end, np.nan, out)
+
+    frame = pd.DataFrame(out.T, index=pd.Index(grid, name='time'), columns=names)
+    report = pd.DataFrame(issues, index=names)
+    report['start'] = start[:, 0]
+    report['end'] = end[:, 0]
+    report['grid_points_covered'] = np.sum((grid >= start) & (grid <= end), axis=1)
+    return frame, report
+
+
+def main():
+    """Align the abaspaper.py and dfg.py versions of the tray curves"""
+    pd.set_option('display.width', 200)
+    sources = {'appendix': APPENDIX_B, 'dfg': TRAYS}
+    curves, names = [], []
+    for src, trays in sources.items():
+        for key, tray in trays.items():
+            curves.append((tray['time'], tray['mc']))
+            names.append(f'{LABELS[key]} ({src})')
+    frame, report = resample_curves(curves, names, step=30.0, outside='hold')
+    print(report.to_string())
+    print()
+    print(frame.iloc[::4].round(2).to_string())
+
+    # With everything on one grid, comparisons are plain array operations
+    a = frame.filter(like='(appendix)').to_numpy()
+    d = frame.filter(like='(dfg)').to_numpy()
+    print(f"\nLargest disagreement between the two transcriptions: "
+          f"{np.nanmax(np.abs(a - d)):.2f} % w.b.")
+    rate = -np.gradient(a, frame.index.to_numpy(), axis=0)
+    print("\nMean drying rate over the common grid (% w.b./min):")
+    print(pd.Series(np.nanmean(rate, axis=0), index=frame.filter(like='(appendix)').columns)
+          .round(4).to_string())
+
+
+if __name__ == "__main__":
+    main()
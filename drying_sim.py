@@ -0,0 +1,325 @@
+"""
+Finite-difference heat-and-mass-transfer simulator for the cylindrical
+passive solar dryer, and design sweeps over thousands of variants.
+
+abaspaper.py, abj.py and dfg.py describe a vertical polycarbonate cylinder
+(radius 20.3 cm, height 40.6 cm, 0.7 mm sheet) with two mesh trays about
+20 cm apart, and can only report the one design that was built. simulate()
+models a whole batch of design variants at once, each a row of arrays:
+
+* the chamber is split into cells along its height; air enters at the
+  bottom at ambient conditions and rises by natural draft (stack flow
+  through the vents, iterated with the mean air temperature);
+* each time step the air temperature and humidity ratio are marched up the
+  cells with an implicit upwind finite-volume update: solar gain through the
+  glazing side wall, loss through the wall (glazing U-value) and, at the
+  tray cells, latent cooling and vapour from the product;
+* the product on each tray follows dX/dt = -k(T) (X - Xe(T, RH)) / (1 + d/d_ref)
+  on a dry basis, with an Arrhenius k, an Oswin-type equilibrium moisture
+  and d the depth of the layer (load over tray area and bulk density), so
+  heavier loads dry more slowly. Its temperature is the air temperature
+  plus the absorbed beam less the heat of evaporation over the convective
+  conductance; the upper tray receives the direct beam through the top
+  and shades the lower one;
+* weather is a clear-day sine for irradiance, ambient temperature and
+  humidity (Uyo-like defaults).
+
+The march is vectorized over variants, so one call handles thousands of
+designs; sweep() splits the design table into chunks for a process pool and
+rank_designs() orders variants by drying time and then efficiency, putting
+those that overheat the product last. k_ref and Ea of the drying constant
+are fitted so the built design reaches 10 % w.b. at about the times of the
+dfg.py trays (upper 11.25 h, lower 14 h from 08:00); the other constants
+are typical textbook values. At these loads drying is limited by the
+product, not by the humidity of the air, so smaller vents (hotter air) dry
+faster until the product temperature limit is reached.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from drying import TRAYS, LABELS
+from drying_threshold import crossing_times
+from psychrometrics import humidity_ratio, relative_humidity
+
+CP_AIR = 1006.0     # J/(kg K)
+H_FG = 2.40e6       # J/kg latent heat of evaporation near 40 °C
+RHO_AIR = 1.15      # kg/m³
+G = 9.81
+
+# glazing -> (solar transmittance, wall U-value W/(m² K)), typical values
+GLAZING = {
+    'polycarbonate': (0.84, 6.0),
+    'twinwall_polycarbonate': (0.76, 3.5),
+    'acrylic': (0.90, 5.6),
+    'glass': (0.86, 5.8),
+}
+
+BASE_DESIGN = {
+    'radius': 0.203,          # m
+    'height': 0.406,          # m
+    'tray_spacing': 0.20,     # m between lower and upper tray
+    'lower_tray': 0.10,       # m above the floor
+    'glazing': 'polycarbonate',
+    'load': 0.032,            # kg wet product per tray
+    'vent_fraction': 0.05,    # vent area as a fraction of the floor area
+}
+
+BULK_DENSITY = 350.0   # kg/m³, wet crayfish spread on a tray
+DEPTH_REF = 0.005      # m, layer depth at which the bed halves the thin-layer rate
+
+MAX_PRODUCT_TEMP = 60.0   # °C, above which dried crayfish scorches
+
+DEFAULT_WEATHER = {'start_hour': 8.0, 'sunrise': 7.0, 'sunset': 19.0, 'irradiance_peak': 550.0,
+                   'temp_mean': 30.0, 'temp_swing': 4.0, 'rh_mean': 0.70, 'rh_swing': 0.15}
+
+
+def weather(hours, irradiance_peak=600.0, sunrise=7.0, sunset=19.0, temp_mean=30.0,
+            temp_swing=4.0, rh_mean=0.70, rh_swing=0.15, start_hour=8.0):
+    """Clear-day irradiance (W/m²), ambient temperature (°C) and RH at clock hours"""
+    clock = (start_hour + hours) % 24
+    day = np.clip((clock - sunrise) / (sunset - sunrise), 0, 1)
+    irradiance = irradiance_peak * np.sin(np.pi * day) * ((clock > sunrise) & (clock < sunset))
+    phase = np.sin(2 * np.pi * (clock - 9) / 24)
+    return irradiance, temp_mean + temp_swing * phase, rh_mean - rh_swing * phase
+
+
+def equilibrium_moisture(temp_c, rh, a=0.05, b=-0.0004, c=0.38):
+    """Oswin-type equilibrium moisture, kg water per kg dry matter"""
+    rh = np.clip(rh, 1e-4, 0.98)
+    return np.clip(a + b * temp_c, 0.02, None) * (rh / (1 - rh)) ** c
+
+
+def drying_constant(temp_c, k_ref=8.0e-5, Ea=16e3, T_ref=40.0):
+    """Arrhenius thin-layer drying constant (1/s), fitted to the dfg.py trays"""
+    return k_ref * np.exp(-Ea / 8.314 * (1 / (temp_c + 273.15) - 1 / (T_ref + 273.15)))
+
+
+def layer_depth(load, tray_area, bulk_density=BULK_DENSITY):
+    """Depth (m) of the product layer spread over a tray"""
+    return load / (bulk_density * tray_area)
+
+
+def design_arrays(designs):
+    """Design table (DataFrame or list of dicts) -> dict of float arrays"""
+    df = pd.DataFrame(designs)
+    for key, value in BASE_DESIGN.items():
+        if key not in df:
+            df[key] = value
+    tau, U = np.array([GLAZING[g] for g in df['glazing']]).T
+    out = {k: df[k].to_numpy(dtype=float) for k in BASE_DESIGN if k != 'glazing'}
+    out['tau'], out['U'] = tau, U
+    return out
+
+
+def simulate(designs, hours=16.0, dt=60.0, n_cells=24, mc0=67.0, target_mc=10.0,
+             weather_kw=None, record=False, alpha=0.9, cd=0.6, h_conv=35.0, view=0.8,
+             bulk_density=BULK_DENSITY, depth_ref=DEPTH_REF):
+    """
+    Simulate every design variant for `hours`. Returns a DataFrame with one
+    row per variant (drying times to target_mc per tray, final MC, peak and
+    mean air temperature, water removed and thermal efficiency) and, with
+    record=True, the tray MC and outlet temperature histories. view is the
+    share of the side beam between the trays that lands on the lower tray.
+    """
+    d = design_arrays(designs)
+    B = len(d['radius'])
+    wkw = dict(DEFAULT_WEATHER, **(weather_kw or {}))
+    r, H = d['radius'][:, None], d['height'][:, None]
+    dz = H / n_cells
+    floor = np.pi * r[:, 0] ** 2
+
+    # tray cells (the upper tray is clipped to the top cell)
+    lower_cell = np.clip((d['lower_tray'] / dz[:, 0]).astype(int), 0, n_cells - 1)
+    upper_cell = np.clip(((d['lower_tray'] + d['tray_spacing']) / dz[:, 0]).astype(int),
+                         0, n_cells - 1)
+
+    x0 = mc0 / (100 - mc0)
+    dry_mass = d['load'] * (1 - mc0 / 100)
+    X = np.full((B, 2), x0)           # lower, upper tray, dry basis
+    tray_area = floor * 0.8
+    depth = layer_depth(d['load'], tray_area, bulk_density)
+    resistance = 1 + depth / depth_ref
+    ones = np.ones((1, n_cells))
+    wall_area = 2 * np.pi * r * dz * ones   # per cell
+    proj_side = 2 * r * dz * ones           # projected side area per cell for beam gain
+    cells = np.arange(n_cells)
+    between = (cells >= lower_cell[:, None]) & (cells < upper_cell[:, None])
+    side_share = np.where(between, 1 - view, 1.0)
+    lower_band = view * (proj_side * between).sum(axis=1)
+
+    steps = int(round(hours * 3600 / dt))
+    t_hist = np.arange(steps + 1) * dt
+    mc_hist = np.empty((steps + 1, B, 2))
+    mc_hist[0] = mc0
+    t_out_hist = np.empty((steps + 1, B))
+    irr_hist = np.empty(steps + 1)
+    T_air = None
+    peak = np.full(B, -np.inf)
+    peak_product = np.full(B, -np.inf)
+    mean_rise = np.zeros(B)
+
+    for s in range(steps + 1):
+        I, Ta, rh_a = weather(t_hist[s] / 3600, **wkw)
+        irr_hist[s] = I
+        w_amb = humidity_ratio(Ta, rh_a)
+        gain = d['tau'][:, None] * alpha * I * proj_side * side_share     # W per cell
+        # beam on the product: side band between the trays (lower), top (upper)
+        beam = alpha * d['tau'][:, None] * I * np.stack([lower_band, tray_area], axis=1)
+
+        # stack-driven flow from the previous mean air temperature
+        rise = np.full(B, 2.0) if T_air is None else np.clip(T_air.mean(axis=1) - Ta, 0.1, None)
+        m_dot = RHO_AIR * cd * d['vent_fraction'] * floor * np.sqrt(
+            2 * G * H[:, 0] * rise / (Ta + 273.15))
+        mcp = (m_dot * CP_AIR)[:, None]
+        UA = d['U'][:, None] * wall_area
+
+        evap = np.zeros((B, 2))       # kg/s
+        T_air = np.empty((B, n_cells))
+        w_air = np.empty((B, n_cells))
+        T_prev = np.full(B, Ta)
+        w_prev = np.full(B, w_amb)
+        for k in range(n_cells):
+            # implicit upwind finite volume: mcp (T_k - T_{k-1}) = gain - UA (T_k - Ta) - latent
+            Tk = (mcp[:, 0] * T_prev + gain[:, k] + UA[:, k] * Ta) / (mcp[:, 0] + UA[:, k])
+            wk = w_prev.copy()
+            for j, cell in ((0, lower_cell), (1, upper_cell)):
+                here = cell == k
+                if not here.any():
+                    continue
+                rh = np.clip(relative_humidity(Tk, wk), 0, 1)
+                xe = equilibrium_moisture(Tk, rh)
+                # product temperature: absorbed beam less the heat of
+                # evaporation, both exchanged with the air by convection
+                e = np.zeros(B)
+                for _ in range(3):
+                    tp = Tk + (beam[:, j] - H_FG * e) / (h_conv * tray_area)
+                    # (bounded a little below the air, which keeps the iteration stable)
+                    e = (dry_mass * drying_constant(np.maximum(tp, Tk - 15)) / resistance
+                         * np.clip(X[:, j] - xe, 0, None))
+                e = np.where(here, e, 0.0)
+                peak_product = np.where(here, np.maximum(peak_product, tp), peak_product)
+                # beam absorbed by the product reaches the air by convection,
+                # the heat of evaporation is drawn from it
+                net = np.where(here, beam[:, j] - H_FG * e, 0.0)
+                Tk = Tk + net / (mcp[:, 0] + UA[:, k])
+                wk = wk + e / np.maximum(m_dot, 1e-9)
+                evap[:, j] += e
+            T_air[:, k], w_air[:, k] = Tk, wk
+            T_prev, w_prev = Tk, wk
+
+        peak = np.maximum(peak, T_air.max(axis=1))
+        mean_rise += (T_air.mean(axis=1) - Ta) / (steps + 1)
+        mc_hist[s] = 100 * X / (1 + X)
+        t_out_hist[s] = T_air[:, -1]
+        if s < steps:
+            X = np.maximum(X - evap * dt / dry_mass[:, None], 0.0)
+
+    hrs = t_hist / 3600
+    times = crossing_times(np.broadcast_to(hrs, (2 * B, len(hrs))),
+                           mc_hist.transpose(1, 2, 0).reshape(2 * B, -1), [target_mc])[:, 0]
+    times = times.reshape(B, 2)
+    water = d['load'] * (1 - mc0 / 100) * (x0 - mc_hist[-1] / (100 - mc_hist[-1])).sum(axis=1)
+    insolation = np.trapezoid(irr_hist, t_hist) * (2 * r[:, 0] * H[:, 0] + floor)
+    summary = pd.DataFrame(designs).reset_index(drop=True)
+    summary = summary.assign(
+        Time_lower_h=times[:, 0], Time_upper_h=times[:, 1],
+        Time_h=np.where(np.isfinite(times).all(axis=1), times.max(axis=1), np.nan),
+        MC_lower=mc_hist[-1, :, 0], MC_upper=mc_hist[-1, :, 1],
+        Peak_T=peak, Peak_product_T=peak_product, Mean_rise=mean_rise, Water_kg=water,
+        Efficiency=water * H_FG / insolation)
+    if not record:
+        return summary
+    history = {'hours': hrs, 'mc': mc_hist, 'outlet_temp': t_out_hist, 'irradiance': irr_hist}
+    return summary, history
+
+
+def design_grid(**levels):
+    """Every combination of the given factor levels (others at BASE_DESIGN)"""
+    keys = list(levels)
+    rows = [dict(zip(keys, combo)) for combo in itertools.product(*levels.values())]
+    return pd.DataFrame(rows)
+
+
+def _simulate_chunk(task):
+    designs, kwargs = task
+    return simulate(designs, **kwargs)
+
+
+def sweep(designs, n_jobs=None, chunk=256, **kwargs):
+    """simulate() over a large design table in chunks on a process pool"""
+    n_jobs = n_jobs or os.cpu_count() or 1
+    designs = pd.DataFrame(designs).reset_index(drop=True)
+    tasks = [(designs.iloc[i:i + chunk], kwargs) for i in range(0, len(designs), chunk)]
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            parts = list(pool.map(_simulate_chunk, tasks))
+    else:
+        parts = [_simulate_chunk(t) for t in tasks]
+    return pd.concat(parts, ignore_index=True)
+
+
+# summary columns where a larger value ranks first
+HIGHER_IS_BETTER = ('Efficiency', 'Water_kg', 'Mean_rise')
+
+
+def rank_designs(results, by=('Time_h', 'Efficiency'), max_product_temp=None):
+    """
+    Order variants: shortest drying time (unfinished last), then highest
+    efficiency. by is a sequence of summary columns (the ones in
+    HIGHER_IS_BETTER descending, the rest ascending) or a {column:
+    ascending} mapping. With max_product_temp (°C), variants that overheat
+    the product rank after all those that keep within it.
+    """
+    order = dict(by) if isinstance(by, dict) else {c: c not in HIGHER_IS_BETTER for c in by}
+    over = (results['Peak_product_T'] > max_product_temp if max_product_temp is not None
+            else pd.Series(False, index=results.index))
+    ranked = results.assign(_over=over).sort_values(['_over', *order],
+                                                    ascending=[True, *order.values()],
+                                                    na_position='last')
+    ranked = ranked.drop(columns='_over').reset_index(drop=True)
+    ranked.insert(0, 'Rank', np.arange(1, len(ranked) + 1))
+    return ranked
+
+
+def main():
+    """Built design against the measured trays, then a design sweep"""
+    pd.set_option('display.width', 200)
+    summary, hist = simulate([BASE_DESIGN], record=True)
+    print("Built design:")
+    print(summary.drop(columns=list(BASE_DESIGN)).round(3).to_string(index=False))
+    every = int(round(2 * 3600 / 60))
+    compare = pd.DataFrame({'hour': hist['hours'][::every],
+                            'Sim lower': hist['mc'][::every, 0, 0],
+                            'Sim upper': hist['mc'][::every, 0, 1],
+                            'Outlet T': hist['outlet_temp'][::every, 0]})
+    for key in ('lower', 'upper'):
+        tray = TRAYS[key]
+        compare[LABELS[key]] = np.interp(compare['hour'] * 60, tray['time'], tray['mc'],
+                                         right=np.nan)
+    print(compare.round(1).to_string(index=False))
+
+    designs = design_grid(tray_spacing=[0.10, 0.15, 0.20, 0.25],
+                          radius=[0.15, 0.203, 0.25, 0.30],
+                          glazing=list(GLAZING),
+                          load=[0.02, 0.032, 0.05, 0.08],
+                          vent_fraction=[0.02, 0.05, 0.10])
+    designs['height'] = np.maximum(0.406, 0.10 + designs['tray_spacing'] + 0.05)
+    t0 = time.perf_counter()
+    results = sweep(designs)
+    elapsed = time.perf_counter() - t0
+    print(f"\n{len(designs):,} design variants in {elapsed:.1f} s")
+    cols = ['Rank', 'tray_spacing', 'radius', 'glazing', 'load', 'vent_fraction', 'Time_lower_h',
+            'Time_upper_h', 'Peak_product_T', 'Efficiency']
+    print(f"Fastest variants keeping the product at or below {MAX_PRODUCT_TEMP:.0f} °C:")
+    ranked = rank_designs(results, max_product_temp=MAX_PRODUCT_TEMP)
+    print(ranked[cols].head(10).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+Columnar store for drying trials, on Parquet with Arrow reads.
+
+prepare_data() in dfg.py/claudClaude.pclaude.py and the arrays at the top
+of abaspaper.py/abj.py each hard-code the same crayfish trials, with small
+differences (see drying.APPENDIX_B against drying.TRAYS). TrialStore keeps
+every trial as rows of one schema,
+
+    trial, source, product, chamber, date, time_min, mc, temp, mass
+
+in a Parquet dataset partitioned by product and chamber (hive layout,
+product=.../chamber=.../part-*.parquet). Queries:
+
+* filter by product and chamber on the partition directories, so other
+  files are never opened;
+* push date-range and trial filters down to Parquet row-group statistics
+  (rows are sorted by date and trial before writing);
+* read only the requested columns, through a memory-mapped filesystem.
+
+snapshot()/read_snapshot() write and memory-map an Arrow IPC file for
+repeated zero-copy loads of a query result. legacy_records() turns the
+existing script data into store rows so the scripts' copies can be retired.
+"""
+
+import os
+import tempfile
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.ipc as ipc
+
+from drying import TRAYS, APPENDIX_B, LABELS
+
+SCHEMA = pa.schema([
+    ('trial', pa.string()),
+    ('source', pa.string()),
+    ('product', pa.string()),
+    ('chamber', pa.string()),
+    ('date', pa.date32()),
+    ('time_min', pa.float64()),
+    ('mc', pa.float64()),        # % wet basis
+    ('temp', pa.float64()),      # °C, null where not logged
+    ('mass', pa.float64()),      # g, null where not logged
+])
+PARTITIONS = ['product', 'chamber']
+
+
+class TrialStore:
+    """Parquet-backed store of drying trials under one directory"""
+
+    def __init__(self, root, row_group_size=64_000):
+        self.root = str(root)
+        self.row_group_size = row_group_size
+        os.makedirs(self.root, exist_ok=True)
+        self._fs = pafs.LocalFileSystem(use_mmap=True)
+
+    def _partitioning(self):
+        return ds.partitioning(pa.schema([(p, pa.string()) for p in PARTITIONS]), flavor='hive')
+
+    def append(self, records):
+        """Add rows (DataFrame or dict of columns); missing optional columns are null"""
+        df = pd.DataFrame(records).copy()
+        for name in ('trial', 'product', 'chamber', 'time_min', 'mc'):
+            if name not in df:
+                raise ValueError(f"records need a '{name}' column")
+        for field in SCHEMA:
+            if field.name not in df:
+                df[field.name] = None
+        df['date'] = pd.to_datetime(df['date']).dt.date
+        df = df.sort_values(['date', 'trial', 'time_min'], na_position='first')
+        table = pa.Table.from_pandas(df[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+        ds.write_dataset(table, self.root, format='parquet', partitioning=self._partitioning(),
+                         basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+                         existing_data_behavior='overwrite_or_ignore',
+                         max_rows_per_group=self.row_group_size,
+                         min_rows_per_group=min(self.row_group_size, 1024))
+        return len(table)
+
+    def dataset(self):
+        """The store as a pyarrow Dataset (memory-mapped files)"""
+        return ds.dataset(self.root, schema=SCHEMA, format='parquet', filesystem=self._fs,
+                          partitioning=self._partitioning())
+
+    @staticmethod
+    def _filter(product=None, chamber=None, start=None, end=None, trial=None, source=None):
+        expr = None
+        for name, value in (('product', product), ('chamber', chamber), ('trial', trial),
+                            ('source', source)):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else list(value)
+            cond = pc.field(name).isin(values)
+            expr = cond if expr is None else expr & cond
+        if start is not None:
+            cond = pc.field('date') >= pa.scalar(pd.Timestamp(start).date(), pa.date32())
+            expr = cond if expr is None else expr & cond
+        if end is not None:
+            cond = pc.field('date') <= pa.scalar(pd.Timestamp(end).date(), pa.date32())
+            expr = cond if expr is None else expr & cond
+        return expr
+
+    def query(self, columns=None, as_pandas=True, **filters):
+        """
+        Rows matching the filters (product, chamber, trial and source take a
+        value or a list; start/end bound the date), only the given columns.
+        """
+        table = self.dataset().to_table(columns=columns, filter=self._filter(**filters))
+        return table.to_pandas() if as_pandas else table
+
+    def trials(self, **filters):
+        """One row per trial: product, chamber, date, samples and time span"""
+        df = self.query(['trial', 'source', 'product', 'chamber', 'date', 'time_min'], **filters)
+        return (df.groupby(['trial', 'source', 'product', 'chamber'], dropna=False)
+                .agg(date=('date', 'first'), samples=('time_min', 'size'),
+                     start=('time_min', 'min'), end=('time_min', 'max')).reset_index())
+
+    def curves(self, value='mc', **filters):
+        """{trial: (time_min, value)} arrays, ready for the drying_* modules"""
+        table = self.query(['trial', 'time_min', value], as_pandas=False, **filters)
+        table = table.sort_by([('trial', 'ascending'), ('time_min', 'ascending')])
+        trial = table['trial'].to_numpy()
+        t = table['time_min'].to_numpy()
+        v = table[value].to_numpy(zero_copy_only=False)
+        cuts = np.flatnonzero(trial[1:] != trial[:-1]) + 1
+        return {tr[0]: (tt, vv) for tr, tt, vv in
+                zip(np.split(trial, cuts), np.split(t, cuts), np.split(v, cuts)) if len(tr)}
+
+    def snapshot(self, path, columns=None, **filters):
+        """Write a query result as an Arrow IPC file for memory-mapped reloads"""
+        table = self.query(columns, as_pandas=False, **filters)
+        with pa.OSFile(str(path), 'wb') as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        return table.num_rows
+
+
+def read_snapshot(path, columns=None):
+    """Arrow table from an IPC snapshot, memory-mapped (no copy of the buffers)"""
+    with pa.memory_map(str(path), 'r') as source:
+        table = ipc.open_file(source).read_all()
+    return table.select(columns) if columns else table
+
+
+def legacy_records(date=None, product='crayfish'):
+    """
+    The trays as typed in the scripts, as store rows: source 'dfg' for
+    drying.TRAYS (dfg.py/claudClaude.pclaude.py) and 'appendix' for
+    drying.APPENDIX_B (abaspaper.py/abj.py). The run date was not recorded.
+    """
+    frames = []
+    for source, trays in (('dfg', TRAYS), ('appendix', APPENDIX_B)):
+        for chamber, tray in trays.items():
+            n = len(tray['time'])
+            frames.append(pd.DataFrame({
+                'trial': f'{source}-{chamber}', 'source': source, 'product': product,
+                'chamber': chamber, 'date': date, 'time_min': np.asarray(tray['time'], dtype=float),
+                'mc': np.asarray(tray['mc'], dtype=float),
+                'temp': np.asarray(tray.get('temp', [np.nan] * n), dtype=float),
+                'mass': np.nan}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def simulate_trials(n_trials, seed=0, start='2024-01-01'):
+    """Synthetic logged trials (one sample a minute) for timing queries"""
+    rng = np.random.default_rng(seed)
+    chambers = np.array(list(LABELS))
+    products = np.array(['crayfish', 'catfish', 'garri'])
+    frames = []
+    for i in range(n_trials):
+        m = int(rng.integers(600, 1200))
+        t = np.arange(m, dtype=float)
+        mc0 = rng.uniform(50, 70)
+        k = rng.uniform(2e-3, 5e-3)
+        mc = mc0 * np.exp(-k * t)
+        frames.append(pd.DataFrame({
+            'trial': f'T{i:05d}', 'source': 'logger', 'product': products[i % 3],
+            'chamber': chambers[rng.integers(3)],
+            'date': pd.Timestamp(start) + pd.Timedelta(days=int(i // 4)),
+            'time_min': t, 'mc': mc, 'temp': 40 + rng.normal(0, 3, m),
+            'mass': 100 * (100 - mc0) / (100 - mc)}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    """Seed a store from the scripts' data, then time queries on a larger one"""
+    pd.set_option('display.width', 200)
+    with tempfile.TemporaryDirectory() as root:
+        store = TrialStore(os.path.join(root, 'legacy'))
+        store.append(legacy_records())
+        print(store.trials().to_string(index=False))
+        curves = store.curves(chamber='lower')
+        print("\nLower-chamber curves:", {k: len(v[0]) for k, v in curves.items()})
+
+        big = TrialStore(os.path.join(root, 'logged'))
+        records = simulate_trials(2_000)
+        t0 = time.perf_counter()
+        big.append(records)
+        print(f"\nWrote {len(records):,} rows ({records['trial'].nunique():,} trials) "
+              f"in {time.perf_counter() - t0:.2f} s")
+        for label, kw in (('all rows, all columns', {}),
+                          ('crayfish, upper chamber', {'product': 'crayfish', 'chamber': 'upper'}),
+                          ('one month, time+mc', {'start': '2024-03-01', 'end': '2024-03-31',
+                                                  'columns': ['trial', 'time_min', 'mc']})):
+            t0 = time.perf_counter()
+            df = big.query(**kw)
+            print(f"{label:28s} {len(df):>9,} rows x {df.shape[1]} cols in "
+                  f"{time.perf_counter() - t0:.3f} s")
+
+        path = os.path.join(root, 'crayfish.arrow')
+        big.snapshot(path, columns=['trial', 'time_min', 'mc'], product='crayfish')
+        t0 = time.perf_counter()
+        table = read_snapshot(path)
+        print(f"memory-mapped snapshot       {table.num_rows:>9,} rows in "
+              f"{time.perf_counter() - t0:.4f} s")
+
+
+if __name__ == "__main__":
+    main()
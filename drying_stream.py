@@ -0,0 +1,220 @@
+"""
+Incremental drying-rate and time-to-target engine for live dryer feeds.
+
+compute_drying_rate in abaspaper.py/abj.py differences complete arrays and
+dfg.py finds the drying time by scanning the finished table for mc <= 10.
+DryingStream instead takes (time, MC or mass, temperature) samples as they
+arrive from any number of dryers and keeps, per dryer and in O(1) per
+sample:
+
+* a fixed-size ring buffer of the last `window` samples;
+* the rolling drying rate across the buffer (oldest to newest sample);
+* a smoothed derivative — the least-squares slope over the buffer from
+  running sums that are updated as samples enter and leave (and rebuilt
+  from the buffer each time it wraps, so rounding cannot drift);
+* running temperature mean/variance (Welford), minimum and maximum;
+* the time the target MC was reached, interpolated between the samples
+  that straddle it, and until then an ETA extrapolated from the smoothed
+  derivative.
+
+State lives in per-field arrays indexed by dryer, so update_many handles
+one sample from each of many dryers in a single vectorized step.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from drying import TRAYS, LABELS, mass_to_mc
+
+
+class DryingStream:
+    """Rolling drying statistics for many dryers, one sample at a time"""
+
+    def __init__(self, window=6, target_mc=10.0, capacity=16):
+        self.window = window
+        self.target_mc = target_mc
+        self.ids = {}
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        w = self.window
+        fields = {
+            'buf_t': (capacity, w), 'buf_m': (capacity, w), 't0': capacity,
+            's_t': capacity, 's_tt': capacity, 's_m': capacity, 's_tm': capacity,
+            'temp_mean': capacity, 'temp_m2': capacity, 'last_t': capacity, 'last_m': capacity,
+            'rate': capacity, 'slope': capacity, 't_target': capacity
+        }
+        old = getattr(self, 'count', None)
+        n_old = 0 if old is None else len(old)
+        for name, shape in fields.items():
+            arr = np.full(shape, np.nan if name in ('rate', 'slope', 't_target') else 0.0)
+            if n_old:
+                arr[:n_old] = getattr(self, name)
+            setattr(self, name, arr)
+        for name, fill in (('count', 0), ('pos', 0), ('temp_n', 0)):
+            arr = np.full(capacity, fill, dtype=np.int64)
+            if n_old:
+                arr[:n_old] = getattr(self, name)
+            setattr(self, name, arr)
+        for name, fill in (('temp_min', np.inf), ('temp_max', -np.inf)):
+            arr = np.full(capacity, fill)
+            if n_old:
+                arr[:n_old] = getattr(self, name)
+            setattr(self, name, arr)
+
+    def _index(self, dryers):
+        idx = np.empty(len(dryers), dtype=np.int64)
+        for i, d in enumerate(dryers):
+            if d not in self.ids:
+                self.ids[d] = len(self.ids)
+            idx[i] = self.ids[d]
+        if len(self.ids) > len(self.count):
+            self._alloc(max(2 * len(self.count), len(self.ids)))
+        return idx
+
+    def update(self, dryer, t, mc=None, temp=np.nan, mass=None, dry_mass=None):
+        """One sample from one dryer; MC may be given as mass and dry-matter mass"""
+        if mc is None:
+            mc = mass_to_mc(mass, dry_mass)
+        self.update_many([dryer], [t], [mc], [temp])
+
+    def update_many(self, dryers, t, mc, temp=None):
+        """One sample each from several distinct dryers (vectorized)"""
+        idx = self._index(dryers)
+        t = np.asarray(t, dtype=float)
+        m = np.asarray(mc, dtype=float)
+        temp = np.full(len(idx), np.nan) if temp is None else np.asarray(temp, dtype=float)
+        w = self.window
+
+        count = self.count[idx]
+        first = count == 0
+        self.t0[idx] = np.where(first, t, self.t0[idx])
+        tr = t - self.t0[idx]
+
+        # target crossing between the previous and the new sample
+        prev_t, prev_m = self.last_t[idx], self.last_m[idx]
+        cross = (~first & np.isnan(self.t_target[idx]) & (prev_m > self.target_mc)
+                 & (m <= self.target_mc))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = (prev_m - self.target_mc) / (prev_m - m)
+        self.t_target[idx] = np.where(cross, prev_t + frac * (t - prev_t), self.t_target[idx])
+        self.t_target[idx] = np.where(first & (m <= self.target_mc), t, self.t_target[idx])
+
+        # ring buffer: drop the sample being overwritten from the running sums
+        pos = self.pos[idx]
+        full = count >= w
+        old_t = np.where(full, self.buf_t[idx, pos], 0.0)
+        old_m = np.where(full, self.buf_m[idx, pos], 0.0)
+        self.s_t[idx] += tr - old_t
+        self.s_tt[idx] += tr * tr - old_t * old_t
+        self.s_m[idx] += m - old_m
+        self.s_tm[idx] += tr * m - old_t * old_m
+        self.buf_t[idx, pos] = tr
+        self.buf_m[idx, pos] = m
+        new_pos = (pos + 1) % w
+        self.pos[idx] = new_pos
+        count = count + 1
+        self.count[idx] = count
+
+        wrapped = idx[new_pos == 0]
+        if len(wrapped):
+            bt, bm = self.buf_t[wrapped], self.buf_m[wrapped]
+            self.s_t[wrapped] = bt.sum(axis=1)
+            self.s_tt[wrapped] = (bt * bt).sum(axis=1)
+            self.s_m[wrapped] = bm.sum(axis=1)
+            self.s_tm[wrapped] = (bt * bm).sum(axis=1)
+
+        # rolling rate across the buffer and least-squares slope over it
+        n = np.minimum(count, w)
+        oldest = np.where(count >= w, new_pos, 0)
+        t_old, m_old = self.buf_t[idx, oldest], self.buf_m[idx, oldest]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.rate[idx] = np.where(n > 1, (m_old - m) / (tr - t_old), np.nan)
+            denom = n * self.s_tt[idx] - self.s_t[idx] ** 2
+            slope = (n * self.s_tm[idx] - self.s_t[idx] * self.s_m[idx]) / denom
+        self.slope[idx] = np.where((n > 1) & (denom > 0), slope, np.nan)
+
+        # temperature statistics (Welford), skipping missing readings
+        ok = np.isfinite(temp)
+        if ok.any():
+            j, x = idx[ok], temp[ok]
+            self.temp_n[j] += 1
+            delta = x - self.temp_mean[j]
+            self.temp_mean[j] += delta / self.temp_n[j]
+            self.temp_m2[j] += delta * (x - self.temp_mean[j])
+            self.temp_min[j] = np.minimum(self.temp_min[j], x)
+            self.temp_max[j] = np.maximum(self.temp_max[j], x)
+
+        self.last_t[idx] = t
+        self.last_m[idx] = m
+
+    def eta(self):
+        """
+        Time at which each dryer reaches the target MC: the interpolated
+        crossing once it has happened, otherwise an extrapolation from the
+        smoothed derivative (NaN while MC is not falling).
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ahead = self.last_t + (self.last_m - self.target_mc) / -self.slope
+        ahead = np.where(self.slope < 0, ahead, np.nan)
+        n = len(self.ids)
+        return np.where(np.isnan(self.t_target[:n]), ahead[:n], self.t_target[:n])
+
+    def snapshot(self):
+        """Current state of every dryer as a DataFrame (Target_time is absolute, as eta())"""
+        n = len(self.ids)
+        temp_n = self.temp_n[:n]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            temp_std = np.sqrt(self.temp_m2[:n] / (temp_n - 1))
+        return pd.DataFrame({
+            'Dryer': list(self.ids),
+            'Samples': self.count[:n],
+            'Time': self.last_t[:n],
+            'MC': self.last_m[:n],
+            'Rate': self.rate[:n],
+            'Smoothed_dMC_dt': self.slope[:n],
+            'Temp_mean': np.where(temp_n > 0, self.temp_mean[:n], np.nan),
+            'Temp_std': np.where(temp_n > 1, temp_std, np.nan),
+            'Temp_min': np.where(temp_n > 0, self.temp_min[:n], np.nan),
+            'Temp_max': np.where(temp_n > 0, self.temp_max[:n], np.nan),
+            'Target_reached': ~np.isnan(self.t_target[:n]),
+            'Target_time': self.eta()
+        })
+
+
+def main():
+    """Replay the tray curves sample by sample, then time a large fleet"""
+    stream = DryingStream(window=4, target_mc=10.0)
+    feeds = []
+    for name, tray in TRAYS.items():
+        temps = tray.get('temp', [np.nan] * len(tray['time']))
+        feeds += [(t, LABELS[name], m, c) for t, m, c in zip(tray['time'], tray['mc'], temps)]
+    for t, dryer, m, c in sorted(feeds, key=lambda f: f[0]):
+        stream.update(dryer, t, m, c)
+        if t == 360:
+            halfway = stream.snapshot()
+    pd.set_option('display.width', 200)
+    print("After 6 h (rates in % w.b. per min, times in min):")
+    print(halfway.round(4).to_string(index=False))
+    print("\nEnd of run:")
+    print(stream.snapshot().round(4).to_string(index=False))
+
+    # Fleet: 10,000 dryers reporting once a minute
+    n_dryers, n_steps = 10_000, 600
+    rng = np.random.default_rng(0)
+    k = rng.uniform(1e-3, 4e-3, n_dryers)
+    ids = np.arange(n_dryers)
+    fleet = DryingStream(window=8, target_mc=10.0, capacity=n_dryers)
+    t0 = time.perf_counter()
+    for step in range(n_steps):
+        mc = 65 * np.exp(-k * step) + rng.normal(0, 0.3, n_dryers)
+        fleet.update_many(ids, np.full(n_dryers, float(step)), mc, 35 + rng.normal(0, 2, n_dryers))
+    elapsed = time.perf_counter() - t0
+    print(f"\n{n_dryers * n_steps:,} samples from {n_dryers:,} dryers in {elapsed:.2f} s "
+          f"({n_dryers * n_steps / elapsed / 1e6:.1f} M samples/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Interpolated time-to-threshold for many drying curves and target moistures.
+
+dfg.py reports drying time as the first sampled hour with mc <= 10, which
+is quantised to the sampling interval and needs a Python generator per
+chamber. crossing_times returns the first time each curve falls to each
+threshold, for a whole (curves x thresholds) matrix at once:
+
+* curves of unequal length are padded flat beyond their last sample;
+* the running minimum of each curve is non-increasing, and its first
+  crossing is the curve's first crossing, so one searchsorted over all
+  curves (rows offset into disjoint ranges) finds the straddling samples;
+* the crossing inside that interval is found by linear interpolation, or on
+  a monotone piecewise-cubic (PCHIP, Fritsch–Carlson slopes) by vectorized
+  bisection.
+
+Curves that never reach a threshold give NaN; curves already below it at
+the first sample give the first time.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from drying import TRAYS, LABELS
+
+DEFAULT_THRESHOLDS = (15.0, 12.0, 10.0, 8.0)
+
+
+def pad_flat(times, values):
+    """
+    (B x m) time and value arrays from unequal-length curves. Padded times
+    keep increasing by the last step and padded values repeat the last value.
+    """
+    m = max(len(t) for t in times)
+    T = np.empty((len(times), m))
+    V = np.empty((len(times), m))
+    for i, (t, v) in enumerate(zip(times, values)):
+        n = len(t)
+        step = t[-1] - t[-2] if n > 1 else 1.0
+        T[i, :n] = t
+        T[i, n:] = t[-1] + step * np.arange(1, m - n + 1)
+        V[i, :n] = v
+        V[i, n:] = v[-1]
+    return T, V
+
+
+def _end_slope(h0, h1, s0, s1):
+    """Non-centred three-point end derivative, limited to keep monotonicity"""
+    de = ((2 * h0 + h1) * s0 - h0 * s1) / (h0 + h1)
+    de = np.where(np.sign(de) != np.sign(s0), 0.0, de)
+    return np.where((np.sign(s0) != np.sign(s1)) & (np.abs(de) > 3 * np.abs(s0)), 3 * s0, de)
+
+
+def pchip_slopes(T, V, lengths=None):
+    """
+    Fritsch–Carlson (PCHIP) derivatives for every row of (B x m) data.
+    lengths gives the number of real samples per row (the rest is padding);
+    the end formula is applied at each row's own last sample.
+    """
+    B, m = V.shape
+    lengths = np.full(B, m) if lengths is None else np.asarray(lengths)
+    h = np.diff(T, axis=1)
+    delta = np.diff(V, axis=1) / h
+    d = np.zeros_like(V)
+    # interior: weighted harmonic mean where the secant slopes agree in sign
+    w1 = 2 * h[:, 1:] + h[:, :-1]
+    w2 = h[:, 1:] + 2 * h[:, :-1]
+    same = delta[:, :-1] * delta[:, 1:] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        hm = (w1 + w2) / (w1 / delta[:, :-1] + w2 / delta[:, 1:])
+    d[:, 1:-1] = np.where(same, hm, 0.0)
+
+    rows = np.arange(B)
+    two = lengths == 2
+    last = lengths - 1
+    # rows with two samples are straight lines
+    d[rows[two], 0] = delta[rows[two], 0]
+    d[rows[two], 1] = delta[rows[two], 0]
+    r = rows[~two]
+    n = last[~two]
+    d[r, 0] = _end_slope(h[r, 0], h[r, 1], delta[r, 0], delta[r, 1])
+    d[r, n] = _end_slope(h[r, n - 1], h[r, n - 2], delta[r, n - 1], delta[r, n - 2])
+    # padding is flat
+    d[np.arange(m)[None, :] > last[:, None]] = 0.0
+    return d
+
+
+def crossing_times(times, values, thresholds=DEFAULT_THRESHOLDS, method='linear'):
+    """
+    First time each curve falls to or below each threshold, as a
+    (curves x thresholds) array. times/values are lists of 1-D arrays (or
+    2-D arrays of equal-length curves). method is 'linear' or 'pchip'.
+    """
+    times = [np.asarray(t, dtype=float) for t in times]
+    T, V = pad_flat(times, [np.asarray(v, dtype=float) for v in values])
+    thr = np.asarray(thresholds, dtype=float)
+    B, m = V.shape
+    R = np.minimum.accumulate(V, axis=1)
+
+    # -R is non-decreasing per row; shift rows into disjoint ranges
+    span = np.nanmax(np.abs(R)) + np.abs(thr).max() + 1.0
+    offset = 2 * span * np.arange(B)[:, None]
+    keys = (-R + offset).ravel()
+    queries = (-thr[None, :] + offset).ravel()
+    flat = np.searchsorted(keys, queries, side='left')
+    j = (flat - np.repeat(np.arange(B) * m, len(thr))).reshape(B, len(thr))
+
+    reached = j < m
+    jc = np.clip(j, 1, m - 1)
+    rows = np.arange(B)[:, None]
+    t0, t1 = T[rows, jc - 1], T[rows, jc]
+    v0, v1 = R[rows, jc - 1], R[rows, jc]
+    target = np.broadcast_to(thr, (B, len(thr)))
+
+    if method == 'linear':
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(v0 > v1, (v0 - target) / (v0 - v1), 1.0)
+        out = t0 + frac * (t1 - t0)
+    elif method == 'pchip':
+        D = pchip_slopes(T, R, [len(t) for t in times])
+        d0, d1 = D[rows, jc - 1], D[rows, jc]
+        h = t1 - t0
+        lo = np.zeros_like(t0)
+        hi = np.ones_like(t0)
+        for _ in range(40):
+            s = 0.5 * (lo + hi)
+            h00 = (1 + 2 * s) * (1 - s) ** 2
+            h10 = s * (1 - s) ** 2
+            h01 = s ** 2 * (3 - 2 * s)
+            h11 = s ** 2 * (s - 1)
+            val = h00 * v0 + h10 * h * d0 + h01 * v1 + h11 * h * d1
+            above = val > target
+            lo = np.where(above, s, lo)
+            hi = np.where(above, hi, s)
+        out = t0 + 0.5 * (lo + hi) * h
+    else:
+        raise ValueError("method must be 'linear' or 'pchip'")
+
+    out = np.where(j == 0, T[:, :1], out)
+    return np.where(reached, out, np.nan)
+
+
+def threshold_table(times, values, names, thresholds=DEFAULT_THRESHOLDS, method='linear',
+                    scale=1.0):
+    """crossing_times as a DataFrame (one row per curve), times divided by scale"""
+    ct = crossing_times(times, values, thresholds, method) / scale
+    return pd.DataFrame(ct, index=names, columns=[f'MC<={t:g}%' for t in thresholds])
+
+
+def main():
+    """Threshold tables for the three trays, then a timing on many trials"""
+    names = [LABELS[k] for k in TRAYS]
+    times = [np.asarray(TRAYS[k]['time'], dtype=float) for k in TRAYS]
+    values = [np.asarray(TRAYS[k]['mc'], dtype=float) for k in TRAYS]
+    pd.set_option('display.width', 200)
+    for method in ('linear', 'pchip'):
+        print(f"Time to threshold (h), {method}:")
+        print(threshold_table(times, values, names, method=method, scale=60).round(3))
+        print()
+
+    rng = np.random.default_rng(0)
+    n = 10_000
+    t = np.arange(0, 1500, 60.0)
+    k = rng.uniform(1e-3, 5e-3, n)
+    V = 68 * np.exp(-k[:, None] * t) + rng.normal(0, 0.5, (n, len(t)))
+    thresholds = np.arange(5, 30, 0.5)
+    t0 = time.perf_counter()
+    crossing_times(np.broadcast_to(t, V.shape), V, thresholds, method='pchip')
+    print(f"{n:,} trials x {len(thresholds)} thresholds (pchip) in "
+          f"{time.perf_counter() - t0:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
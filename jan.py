@@ -54,18 +54,19 @@ df.to_csv('kiln_trials.csv', index=False)
 # ----------------------------------------------------------
 # 2.  Extra analytics for richness
 # ----------------------------------------------------------
-# 2a. Effective diffusivity (crude) via slope method
-def effective_diffusivity(slope, L):
-    # slope = ln(MR) vs t ;  L = half-thickness (m)
-    return -slope * (L**2) / (np.pi**2) * 3600  # m²/s
-
-sl_fab, _, _, _, _ = stats.linregress(df[df.kiln=='Fabricated']['hour'],
-                                      np.log(1-df[df.kiln=='Fabricated']['moisture_loss']/100))
-sl_loc, _, _, _, _ = stats.linregress(df[df.kiln=='Local']['hour'],
-                                      np.log(1-df[df.kiln=='Local']['moisture_loss']/100))
+# 2a. Effective diffusivity: full Fick slab series fitted to each fish,
+#     taking MR as the weight ratio W/W0 as the slope method did
+from drying_diffusivity import fit_diffusivity
+
 L = 0.01  # assumed 1 cm half-thickness
-Deff_fab = effective_diffusivity(sl_fab, L)
-Deff_loc = effective_diffusivity(sl_loc, L)
+def kiln_diffusivity(wide):
+    hours = np.array([time_map[c] for c in wide.columns if c != 'kiln'], dtype=float)
+    w = wide.drop(columns='kiln').to_numpy(dtype=float)
+    curves = [(hours * 3600, row / row[0]) for row in w]
+    return fit_diffusivity(curves, L, 'slab')['D_eff'].mean()  # m²/s
+
+Deff_fab = kiln_diffusivity(fab)
+Deff_loc = kiln_diffusivity(loc)
 
 # 2b. Energy metrics
 char_mass = 2.5  # kg per trial (thesis)
@@ -0,0 +1,219 @@
+"""
+Vectorized psychrometrics for dryer and kiln air.
+
+dfg.py plots the tray temperatures against a fixed 30 °C ambient line and
+never looks at humidity, so the energy picked up by the drying air and the
+dryer efficiency cannot be worked out. The functions here take scalars or
+whole NumPy arrays (temperatures in °C, pressures in Pa, humidity ratio in
+kg water per kg dry air, RH as a fraction) and follow the ASHRAE
+Fundamentals formulation:
+
+* saturation pressure from Hyland–Wexler (over ice below 0 °C);
+* humidity ratio, vapour pressure, RH, enthalpy and specific volume in
+  closed form;
+* dew point by Newton iteration on ln p_ws, started from the Magnus
+  inversion;
+* wet-bulb temperature by a vectorized safeguarded Newton solve of the
+  ASHRAE wet-bulb equation, bracketed by the dew point and dry-bulb
+  temperatures. Only the points not yet converged are updated, so a
+  year-long log at one-minute resolution takes a few seconds.
+
+air_state() tabulates everything for a (T, RH) series. pickup_efficiency()
+gives the share of the air's adiabatic drying capacity that was used.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from drying import TRAYS, LABELS
+
+P_ATM = 101325.0     # Pa
+EPS = 0.621945       # molar mass ratio water / dry air
+R_DA = 287.042       # J/(kg K) dry air
+
+# Hyland–Wexler coefficients (ASHRAE Fundamentals 2017, ch. 1)
+_ICE = (-5.6745359e3, 6.3925247, -9.6778430e-3, 6.2215701e-7, 2.0747825e-9,
+        -9.4840240e-13, 4.1635019)
+_WATER = (-5.8002206e3, 1.3914993, -4.8640239e-2, 4.1764768e-5, -1.4452093e-8, 6.5459673)
+
+
+def saturation_pressure(temp_c):
+    """Saturation vapour pressure (Pa) over water, or over ice below 0 °C"""
+    T = np.asarray(temp_c, dtype=float) + 273.15
+    c = _WATER
+    ln_w = c[0] / T + c[1] + c[2] * T + c[3] * T ** 2 + c[4] * T ** 3 + c[5] * np.log(T)
+    c = _ICE
+    ln_i = (c[0] / T + c[1] + c[2] * T + c[3] * T ** 2 + c[4] * T ** 3 + c[5] * T ** 4
+            + c[6] * np.log(T))
+    return np.exp(np.where(T >= 273.15, ln_w, ln_i))
+
+
+def _dln_psat(temp_c):
+    """d ln p_ws / dT, for the Newton steps"""
+    T = np.asarray(temp_c, dtype=float) + 273.15
+    c = _WATER
+    d_w = -c[0] / T ** 2 + c[2] + 2 * c[3] * T + 3 * c[4] * T ** 2 + c[5] / T
+    c = _ICE
+    d_i = (-c[0] / T ** 2 + c[2] + 2 * c[3] * T + 3 * c[4] * T ** 2 + 4 * c[5] * T ** 3
+           + c[6] / T)
+    return np.where(T >= 273.15, d_w, d_i)
+
+
+def humidity_ratio_from_pressure(p_v, p=P_ATM):
+    """Humidity ratio from vapour partial pressure"""
+    p_v = np.asarray(p_v, dtype=float)
+    return EPS * p_v / (p - p_v)
+
+
+def vapour_pressure(w, p=P_ATM):
+    """Vapour partial pressure from humidity ratio"""
+    w = np.asarray(w, dtype=float)
+    return p * w / (EPS + w)
+
+
+def humidity_ratio(temp_c, rh, p=P_ATM):
+    """Humidity ratio from dry-bulb temperature and RH"""
+    return humidity_ratio_from_pressure(np.asarray(rh, dtype=float) * saturation_pressure(temp_c), p)
+
+
+def relative_humidity(temp_c, w, p=P_ATM):
+    """RH (fraction) from dry-bulb temperature and humidity ratio"""
+    return vapour_pressure(w, p) / saturation_pressure(temp_c)
+
+
+def enthalpy(temp_c, w):
+    """Moist-air enthalpy, kJ per kg dry air"""
+    temp_c = np.asarray(temp_c, dtype=float)
+    return 1.006 * temp_c + np.asarray(w, dtype=float) * (2501.0 + 1.86 * temp_c)
+
+
+def specific_volume(temp_c, w, p=P_ATM):
+    """Moist-air specific volume, m³ per kg dry air"""
+    T = np.asarray(temp_c, dtype=float) + 273.15
+    return R_DA * T * (1 + 1.607858 * np.asarray(w, dtype=float)) / p
+
+
+def dew_point(p_v, tol=1e-6, max_iter=50):
+    """Dew-point temperature (°C) for vapour pressure p_v, by Newton on ln p_ws"""
+    p_v = np.asarray(p_v, dtype=float)
+    target = np.log(np.maximum(p_v, 1e-3))
+    # Magnus inversion as the starting point
+    g = np.log(np.maximum(p_v, 1e-3) / 610.94)
+    td = 243.04 * g / (17.625 - g)
+    for _ in range(max_iter):
+        step = (np.log(saturation_pressure(td)) - target) / _dln_psat(td)
+        td = td - step
+        if np.all(np.abs(step) < tol):
+            break
+    return td
+
+
+def _wet_bulb_residual(tw, temp_c, w, p):
+    """Humidity ratio implied by a wet-bulb guess minus the actual one"""
+    ws = humidity_ratio_from_pressure(saturation_pressure(tw), p)
+    above = ((2501.0 - 2.326 * tw) * ws - 1.006 * (temp_c - tw)) / (2501.0 + 1.86 * temp_c - 4.186 * tw)
+    below = ((2830.0 - 0.24 * tw) * ws - 1.006 * (temp_c - tw)) / (2830.0 + 1.86 * temp_c - 2.1 * tw)
+    return np.where(tw >= 0, above, below) - w
+
+
+def wet_bulb(temp_c, w, p=P_ATM, tol=1e-6, max_iter=60):
+    """
+    Thermodynamic wet-bulb temperature (°C) from dry-bulb temperature and
+    humidity ratio. Newton steps with a numerical derivative, kept inside a
+    shrinking [dew point, dry bulb] bracket; converged points drop out.
+    """
+    temp_c, w = np.broadcast_arrays(np.asarray(temp_c, dtype=float), np.asarray(w, dtype=float))
+    p = np.broadcast_to(np.asarray(p, dtype=float), temp_c.shape)
+    shape = temp_c.shape
+    T, W, P = temp_c.ravel(), w.ravel(), p.ravel()
+    lo = np.minimum(dew_point(vapour_pressure(W, P)), T)
+    hi = T.copy()
+    tw = lo + 0.4 * (hi - lo)
+    out = np.empty_like(T)
+    active = np.arange(len(T))
+    h = 1e-4
+    for _ in range(max_iter):
+        t, a, b = T[active], lo[active], hi[active]
+        x, ww, pp = tw[active], W[active], P[active]
+        f = _wet_bulb_residual(x, t, ww, pp)
+        # the residual increases with the wet-bulb guess
+        a = np.where(f < 0, x, a)
+        b = np.where(f > 0, x, b)
+        df = (_wet_bulb_residual(x + h, t, ww, pp) - f) / h
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_new = x - f / df
+        bad = ~np.isfinite(x_new) | (x_new <= a) | (x_new >= b)
+        x_new = np.where(bad, 0.5 * (a + b), x_new)
+        done = (np.abs(x_new - x) < tol) | (b - a < tol)
+        out[active[done]] = x_new[done]
+        keep = ~done
+        active = active[keep]
+        lo[active], hi[active], tw[active] = a[keep], b[keep], x_new[keep]
+        if not len(active):
+            break
+    out[active] = tw[active]
+    return out.reshape(shape)
+
+
+def air_state(temp_c, rh, p=P_ATM):
+    """All psychrometric properties, one row per (T, RH) point; scalars or arrays"""
+    temp_c, rh = np.broadcast_arrays(np.atleast_1d(np.asarray(temp_c, dtype=float)),
+                                     np.atleast_1d(np.asarray(rh, dtype=float)))
+    temp_c, rh = temp_c.ravel(), rh.ravel()
+    w = humidity_ratio(temp_c, rh, p)
+    p_v = vapour_pressure(w, p)
+    return pd.DataFrame({
+        'T_db': temp_c, 'RH': rh,
+        'W': w, 'P_v': p_v, 'T_dp': dew_point(p_v), 'T_wb': wet_bulb(temp_c, w, p),
+        'h': enthalpy(temp_c, w), 'v': specific_volume(temp_c, w, p)
+    })
+
+
+def pickup_efficiency(t_in, w_in, w_out, p=P_ATM):
+    """
+    Share of the inlet air's adiabatic drying capacity that was used:
+    (W_out - W_in) / (W_sat at the inlet wet bulb - W_in).
+    """
+    tw = wet_bulb(t_in, w_in, p)
+    w_sat = humidity_ratio_from_pressure(saturation_pressure(tw), p)
+    return (np.asarray(w_out, dtype=float) - w_in) / (w_sat - w_in)
+
+
+def main():
+    """Chamber air from the dfg.py tray temperatures, then a year of minute data"""
+    pd.set_option('display.width', 200)
+    ambient_t, ambient_rh = 30.0, 0.75   # dfg.py ambient line; RH assumed
+    w_amb = humidity_ratio(ambient_t, ambient_rh)
+    print(f"Ambient: {ambient_t} °C, RH {ambient_rh:.0%}, W = {w_amb * 1000:.2f} g/kg, "
+          f"h = {enthalpy(ambient_t, w_amb):.1f} kJ/kg")
+    for key in ('upper', 'lower'):
+        tray = TRAYS[key]
+        t = np.asarray(tray['temp'])
+        # sensible heating of ambient air: W unchanged
+        state = pd.DataFrame({'time': tray['time'], 'T_db': t,
+                              'RH': relative_humidity(t, w_amb),
+                              'T_wb': wet_bulb(t, w_amb),
+                              'dh': enthalpy(t, w_amb) - enthalpy(ambient_t, w_amb)})
+        # water each kg of air could still take up at its own wet bulb
+        state['capacity_g_kg'] = 1000 * (humidity_ratio_from_pressure(
+            saturation_pressure(state['T_wb'].to_numpy())) - w_amb)
+        print(f"\n{LABELS[key]} (heated ambient air):")
+        print(state.round(3).to_string(index=False))
+
+    n = 365 * 24 * 60
+    minutes = np.arange(n)
+    rng = np.random.default_rng(0)
+    day = 2 * np.pi * minutes / 1440
+    T = 27 + 4 * np.sin(day - 2.2) + rng.normal(0, 0.5, n)
+    RH = np.clip(0.78 - 0.15 * np.sin(day - 2.2) + rng.normal(0, 0.03, n), 0.2, 1.0)
+    t0 = time.perf_counter()
+    table = air_state(T, RH)
+    elapsed = time.perf_counter() - t0
+    print(f"\n{n:,} minute records (one year) in {elapsed:.2f} s")
+    print(table.describe().loc[['mean', 'min', 'max']].round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Shared response-surface helpers for the jatropha oil extraction study
+(Table 4.1, 30-run central composite design, four factors).
+
+dat.py and data.py each carry their own copy of the design table and build
+the quadratic model through sklearn/statsmodels. The helpers here keep one
+copy of the table, the coding scheme and a plain-NumPy quadratic design
+matrix so the analysis modules (rsm_*.py) can share them.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Coded factor names and their process variables
+FACTORS = ['X1', 'X2', 'X3', 'X4']
+
+LABELS = {
+    'X1': 'Moisture Content (%)',
+    'X2': 'Heating Temperature (°C)',
+    'X3': 'Heating Time (min)',
+    'X4': 'Extraction Time (min)'
+}
+
+# (centre, step) so that actual = centre + step * coded
+CODING = {
+    'X1': (10, 2),    # MC
+    'X2': (70, 10),   # HT
+    'X3': (25, 5),    # Ht
+    'X4': (120, 30)   # SET
+}
+
+# Data from Table 4.1 (SET for run 10 follows its coded level X4 = 0)
+DESIGN = {
+    'Run': list(range(1, 31)),
+    'X1': [0,-1,1,-1,1,-1,1,-1,1,0,0,-2,0,0,0,0,0,0,2,0,0,-1,1,-1,1,-1,1,-1,1,0],
+    'X2': [0,-1,-1,1,1,-1,-1,1,1,0,-2,0,0,0,0,0,0,0,0,2,0,-1,-1,1,1,-1,-1,1,1,0],
+    'X3': [0,-1,-1,-1,-1,1,1,1,1,-2,0,0,0,0,0,0,0,0,0,0,2,-1,-1,-1,-1,1,1,1,1,0],
+    'X4': [-2,-1,-1,-1,-1,-1,-1,-1,-1,0,0,0,0,0,0,0,0,0,0,0,0,1,1,1,1,1,1,1,1,2],
+    'MC': [10,8,12,8,12,8,12,8,12,6,14,6,14,8,10,6,12,14,6,12,8,14,6,4,10,14,6,12,12,14],
+    'Ht': [25,20,35,25,20,20,15,20,20,15,20,15,35,30,25,35,25,15,20,30,20,15,15,35,20,15,25,30,35,30],
+    'HT': [70,60,60,60,60,80,80,80,80,50,70,70,90,70,70,90,80,70,70,70,90,60,50,70,90,80,60,90,80,70],
+    'SET': [60,90,90,60,90,60,90,150,120,120,150,90,120,90,60,90,180,150,60,90,60,180,60,90,120,180,90,180,60,90],
+    'Oil_Yield': [13.83,16.05,16.73,13.12,16.16,13.69,14.01,18.87,17.96,11.59,17.98,15.19,18.96,14.98,13.23,15.79,19.12,18.09,13.41,17.74,13.06,18.54,13.27,18.68,21.04,23.01,14.66,26.70,14.05,15.31]
+}
+
+
+def load_design():
+    """Return the Table 4.1 design as a DataFrame"""
+    return pd.DataFrame(DESIGN)
+
+
+def coded_to_actual(coded, var):
+    """Convert coded level(s) of a factor to actual process units"""
+    centre, step = CODING[var]
+    return centre + step * np.asarray(coded, dtype=float)
+
+
+def actual_to_coded(actual, var):
+    """Convert actual process units of a factor to coded level(s)"""
+    centre, step = CODING[var]
+    return (np.asarray(actual, dtype=float) - centre) / step
+
+
+def quadratic_terms(k=4):
+    """
+    Exponent tuples for the full second-order model in k factors, ordered
+    intercept, linear, pure quadratic, two-factor interactions (the same
+    layout as rsm_formula in data.py).
+    """
+    terms = [(0,) * k]
+    for i in range(k):
+        e = [0] * k
+        e[i] = 1
+        terms.append(tuple(e))
+    for i in range(k):
+        e = [0] * k
+        e[i] = 2
+        terms.append(tuple(e))
+    for i in range(k):
+        for j in range(i + 1, k):
+            e = [0] * k
+            e[i] = e[j] = 1
+            terms.append(tuple(e))
+    return terms
+
+
+def term_names(terms, factors=None):
+    """Readable names ('Intercept', 'X1', 'X1^2', 'X1:X2') for exponent tuples"""
+    factors = factors or FACTORS
+    names = []
+    for e in terms:
+        parts = []
+        for f, p in zip(factors, e):
+            if p == 1:
+                parts.append(f)
+            elif p > 1:
+                parts.append(f'{f}^{p}')
+        names.append(':'.join(parts) if parts else 'Intercept')
+    return names
+
+
+def design_matrix(X_coded, terms=None):
+    """
+    Model matrix for coded settings X_coded (n x k) and exponent tuples
+    terms. Columns are built as products of the factor columns, so no
+    per-row Python loop is involved.
+    """
+    X_coded = np.atleast_2d(np.asarray(X_coded, dtype=float))
+    n, k = X_coded.shape
+    terms = terms if terms is not None else quadratic_terms(k)
+    M = np.ones((n, len(terms)))
+    for c, e in enumerate(terms):
+        for i, p in enumerate(e):
+            if p == 1:
+                M[:, c] *= X_coded[:, i]
+            elif p > 1:
+                M[:, c] *= X_coded[:, i] ** p
+    return M
+
+
+def fit_ols(X, y):
+    """
+    Least-squares fit through a thin QR of the model matrix.
+    Returns a dict with coefficients, fitted values, residuals, SSE, the
+    residual degrees of freedom, sigma^2 and the Q/R factors.
+    """
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, p = X.shape
+    Q, R = np.linalg.qr(X)
+    coef = np.linalg.solve(R, Q.T @ y)
+    fitted = X @ coef
+    resid = y - fitted
+    sse = float(resid @ resid)
+    df_resid = n - p
+    return {
+        'coef': coef,
+        'fitted': fitted,
+        'resid': resid,
+        'sse': sse,
+        'df_resid': df_resid,
+        'sigma2': sse / df_resid if df_resid > 0 else np.nan,
+        'Q': Q,
+        'R': R
+    }
+
+
+def prediction_bands(F, coef, xtx_inv, sigma2, df_resid, alpha=0.05):
+    """
+    Mean surface with pointwise standard errors, confidence and prediction
+    intervals for the rows of model matrix F. The variance factor
+    f'(X'X)⁻¹f is one batched quadratic form over all rows, so uncertainty
+    costs about the same as the mean.
+    """
+    from scipy.stats import t
+
+    F = np.asarray(F, dtype=float)
+    mean = F @ np.asarray(coef, dtype=float)
+    q = np.einsum('ij,ij->i', F @ np.asarray(xtx_inv, dtype=float), F)
+    se_mean = np.sqrt(sigma2 * q)
+    se_pred = np.sqrt(sigma2 * (1 + q))
+    tq = t.ppf(1 - alpha / 2, df_resid)
+    return {
+        'mean': mean,
+        'se_mean': se_mean,
+        'ci_low': mean - tq * se_mean,
+        'ci_high': mean + tq * se_mean,
+        'se_pred': se_pred,
+        'pi_low': mean - tq * se_pred,
+        'pi_high': mean + tq * se_pred
+    }
@@ -0,0 +1,158 @@
+"""
+Response surface atlas: every factor pair at several fixed levels.
+
+dat.py draws 4 of the 6 factor pairs and data.py 3, always with the other
+factors at the centre. The atlas covers all 6 pairs with the two remaining
+factors at every combination of the fixed levels (−1, 0, +1 by default,
+6 × 9 = 54 slices). All slice grids are stacked into one array and scored
+in a single batched prediction; the contour and 3-D surface panels are then
+drawn by a pool of worker processes, and one overview grid figure is
+written alongside them.
+"""
+
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from rsm import load_design, coded_to_actual, FACTORS, LABELS
+
+
+def atlas_slices(factors=None, levels=(-1, 0, 1)):
+    """(x_var, y_var, {fixed var: level}) for every pair and level combination"""
+    factors = factors or FACTORS
+    slices = []
+    for x_var, y_var in itertools.combinations(factors, 2):
+        others = [f for f in factors if f not in (x_var, y_var)]
+        for combo in itertools.product(levels, repeat=len(others)):
+            slices.append((x_var, y_var, dict(zip(others, combo))))
+    return slices
+
+
+def evaluate_slices(predict, slices, factors=None, n=50, bound=2.0):
+    """
+    Predicted surfaces for all slices from one call to predict.
+    Returns the coded axis and an array of shape (len(slices), n, n)
+    indexed [slice, y, x].
+    """
+    factors = factors or FACTORS
+    axis = np.linspace(-bound, bound, n)
+    gx, gy = np.meshgrid(axis, axis)
+    X = np.zeros((len(slices), n * n, len(factors)))
+    for s, (x_var, y_var, fixed) in enumerate(slices):
+        X[s, :, factors.index(x_var)] = gx.ravel()
+        X[s, :, factors.index(y_var)] = gy.ravel()
+        for var, level in fixed.items():
+            X[s, :, factors.index(var)] = level
+    Z = np.asarray(predict(X.reshape(-1, len(factors))), dtype=float)
+    return axis, Z.reshape(len(slices), n, n)
+
+
+def _fixed_text(fixed):
+    return ', '.join(f'{v}={l:+g}' for v, l in fixed.items())
+
+
+def _panel_name(x_var, y_var, fixed):
+    tag = '_'.join(f'{v}={l:g}' for v, l in fixed.items())
+    return f'{x_var}_{y_var}_{tag}'
+
+
+def _render_panel(task):
+    """Draw the contour and 3-D surface for one slice (runs in a worker)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    x_var, y_var, fixed, axis, Z, out_dir, zlim = task
+    V1, V2 = np.meshgrid(coded_to_actual(axis, x_var), coded_to_actual(axis, y_var))
+    name = _panel_name(x_var, y_var, fixed)
+    suffix = f' ({_fixed_text(fixed)})'
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    contour = ax.contourf(V1, V2, Z, levels=np.linspace(*zlim, 16), cmap='viridis')
+    plt.colorbar(contour, ax=ax, label='Oil Yield (%)')
+    ax.contour(V1, V2, Z, levels=10, colors='white', linewidths=0.5, alpha=0.4)
+    ax.set_xlabel(LABELS[x_var], fontsize=11, fontweight='bold')
+    ax.set_ylabel(LABELS[y_var], fontsize=11, fontweight='bold')
+    ax.set_title(f'Contour: {x_var} vs {y_var}{suffix}', fontsize=12, fontweight='bold')
+    contour_file = os.path.join(out_dir, f'contour_{name}.png')
+    fig.savefig(contour_file, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+
+    fig = plt.figure(figsize=(9, 7))
+    ax = fig.add_subplot(111, projection='3d')
+    surf = ax.plot_surface(V1, V2, Z, cmap='viridis', vmin=zlim[0], vmax=zlim[1], edgecolor='none')
+    ax.set_xlabel(LABELS[x_var])
+    ax.set_ylabel(LABELS[y_var])
+    ax.set_zlabel('Oil Yield (%)')
+    ax.set_zlim(*zlim)
+    ax.set_title(f'3D Surface: {x_var} vs {y_var}{suffix}', fontsize=12, fontweight='bold')
+    fig.colorbar(surf, ax=ax, shrink=0.5, aspect=8, label='Oil Yield (%)')
+    ax.view_init(elev=25, azim=45)
+    surface_file = os.path.join(out_dir, f'surface_{name}.png')
+    fig.savefig(surface_file, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return contour_file, surface_file
+
+
+def _render_grid(slices, axis, Z, out_dir, zlim, levels_per_pair):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    n_pairs = len(slices) // levels_per_pair
+    fig, axes = plt.subplots(n_pairs, levels_per_pair,
+                             figsize=(2.2 * levels_per_pair, 2.4 * n_pairs), squeeze=False,
+                             layout='constrained')
+    norm_levels = np.linspace(*zlim, 16)
+    for s, (x_var, y_var, fixed) in enumerate(slices):
+        ax = axes[s // levels_per_pair, s % levels_per_pair]
+        cs = ax.contourf(axis, axis, Z[s], levels=norm_levels, cmap='viridis')
+        ax.set_title(_fixed_text(fixed), fontsize=7)
+        ax.tick_params(labelsize=6)
+        if s % levels_per_pair == 0:
+            ax.set_ylabel(f'{y_var} vs {x_var}', fontsize=8, fontweight='bold')
+    fig.colorbar(cs, ax=axes, shrink=0.6, label='Oil Yield (%)')
+    fig.suptitle('Response Surface Atlas (coded units)', fontsize=14, fontweight='bold')
+    grid_file = os.path.join(out_dir, 'atlas_grid.png')
+    fig.savefig(grid_file, dpi=150, bbox_inches='tight')
+    plt.close(fig)
+    return grid_file
+
+
+def render_atlas(predict, out_dir='atlas', levels=(-1, 0, 1), n=50, n_jobs=None):
+    """
+    Evaluate and render the full atlas. Returns the grid figure path and
+    the list of (contour, surface) panel paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    slices = atlas_slices(levels=levels)
+    axis, Z = evaluate_slices(predict, slices, n=n)
+    # one colour scale for every panel so slices are comparable
+    zlim = (float(np.floor(Z.min())), float(np.ceil(Z.max())))
+    tasks = [(x_var, y_var, fixed, axis, Z[s], out_dir, zlim)
+             for s, (x_var, y_var, fixed) in enumerate(slices)]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        panels = pool.map(_render_panel, tasks, chunksize=max(1, len(tasks) // 32))
+        grid = pool.submit(_render_grid, slices, axis, Z, out_dir, zlim,
+                           len(levels) ** (len(FACTORS) - 2))
+        panels = list(panels)
+        grid_file = grid.result()
+    return grid_file, panels
+
+
+def main():
+    """Render the atlas for the full quadratic model on Table 4.1"""
+    from rsm_model import RSMModel
+    df = load_design()
+    model = RSMModel.fit(df[FACTORS].values, df['Oil_Yield'].values)
+    t0 = time.perf_counter()
+    grid_file, panels = render_atlas(model.predict)
+    print(f"Rendered {len(panels)} slices ({2 * len(panels)} panels) and {grid_file} "
+          f"in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Sequential experiment recommender for the extraction factor space.
+
+After the 30 runs of Table 4.1 the next runs are chosen by hand. Here a
+GPSurrogate (rsm_gp.py) fitted to the existing design proposes the next
+batch of q runs by expected improvement (EI):
+
+* EI is evaluated for a large random candidate set in one vectorized pass;
+* the best candidates seed local L-BFGS-B refinements, run in parallel
+  worker processes;
+* a batch is built by the kriging-believer heuristic — each chosen point is
+  appended to a copy of the surrogate as a noise-free observation at its
+  predicted mean (a rank-one extension of the cached Cholesky factor),
+  which pushes the next pick elsewhere.
+
+Measured results are added with GPSurrogate.append, so the surrogate is
+updated incrementally rather than refitted from zero.
+"""
+
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize
+from scipy.stats import norm
+
+from rsm import load_design, coded_to_actual, FACTORS
+from rsm_gp import GPSurrogate
+
+
+def expected_improvement(gp, X, best, xi=0.01):
+    """EI over rows of X for maximisation of the response"""
+    mu, sigma = gp.predict(X, return_std=True)
+    imp = mu - best - xi
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.where(sigma > 0, imp / sigma, 0.0)
+    ei = imp * norm.cdf(z) + sigma * norm.pdf(z)
+    return np.where(sigma > 0, np.maximum(ei, 0.0), 0.0)
+
+
+def _refine(args):
+    """Local maximisation of EI from one start point (runs in a worker)"""
+    gp, x0, best, xi, bounds = args
+    res = minimize(lambda x: -expected_improvement(gp, x[None, :], best, xi)[0], x0,
+                   method='L-BFGS-B', bounds=bounds)
+    return res.x, -res.fun
+
+
+def maximise_ei(gp, best, bounds, n_candidates=100000, n_starts=8, xi=0.01, n_jobs=1, rng=None):
+    """Best EI point: vectorized random screening followed by multi-start refinement"""
+    rng = rng or np.random.default_rng(0)
+    lo = np.array([b[0] for b in bounds])
+    hi = np.array([b[1] for b in bounds])
+    cand = rng.uniform(lo, hi, size=(n_candidates, len(bounds)))
+    ei = expected_improvement(gp, cand, best, xi)
+    starts = cand[np.argsort(ei)[-n_starts:]]
+    tasks = [(gp, x0, best, xi, bounds) for x0 in starts]
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_refine, tasks))
+    else:
+        results = [_refine(t) for t in tasks]
+    x, val = max(results, key=lambda r: r[1])
+    return x, val
+
+
+def propose_batch(gp, q=4, bounds=None, xi=0.01, n_candidates=100000, n_starts=8,
+                  n_jobs=1, seed=0):
+    """
+    Next q runs (coded units) by kriging-believer batch EI. Returns a
+    DataFrame with coded and actual settings, predicted yield, its standard
+    deviation and the EI at the time each point was picked.
+    """
+    k = gp.X.shape[1]
+    bounds = bounds or [(-2.0, 2.0)] * k
+    rng = np.random.default_rng(seed)
+    believer = copy.deepcopy(gp)
+    rows = []
+    for _ in range(q):
+        # noisy observations: the incumbent is the best posterior mean at a tried point
+        best = believer.predict(believer.X).max()
+        x, ei = maximise_ei(believer, best, bounds, n_candidates, n_starts, xi, n_jobs, rng)
+        mu, sd = gp.predict(x[None, :], return_std=True)
+        rows.append(list(x) + [mu[0], sd[0], ei])
+        believer.append(x[None, :], believer.predict(x[None, :]), noise_var=1e-6)
+    factors = FACTORS[:k]
+    out = pd.DataFrame(rows, columns=factors + ['Pred_Yield', 'Pred_SD', 'EI'])
+    if factors == FACTORS:
+        for code, name in zip(FACTORS, ['MC', 'HT', 'Ht', 'SET']):
+            out[name] = coded_to_actual(out[code], code)
+    return out
+
+
+def main():
+    """Propose the next four extraction runs after Table 4.1"""
+    df = load_design()
+    X = df[FACTORS].values.astype(float)
+    y = df['Oil_Yield'].values
+    gp = GPSurrogate().fit(X, y)
+    batch = propose_batch(gp, q=4)
+    pd.set_option('display.width', 200)
+    print("Proposed next runs:")
+    print(batch.round(3).to_string(index=False))
+
+    # When the measured yields come back they are appended, not refitted
+    measured = batch['Pred_Yield'].values
+    gp.append(batch[FACTORS].values, measured)
+    print(f"\nSurrogate now holds {len(gp.y)} runs; next batch:")
+    print(propose_batch(gp, q=2).round(3).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
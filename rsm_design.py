@@ -0,0 +1,336 @@
+"""
+Experimental design generator for the next extraction campaign.
+
+The 30-run design in dat.py/data.py was typed in by hand. This module builds
+rotatable and face-centred central composite designs, Box–Behnken designs
+and D/I-optimal designs for (possibly constrained) regions.
+
+Optimal designs are found by exchange. Removing design row x and adding
+candidate z changes the information matrix M by two rank-one terms, so by
+the matrix determinant lemma
+
+    det(M - xx' + zz') / det(M) = (1 - x'M⁻¹x) · (1 + z'M₋⁻¹z)
+
+where M₋⁻¹ is the Sherman–Morrison downdate of M⁻¹ without x. Every
+candidate for a row is scored in one matrix product, and M⁻¹ is updated in
+O(p²) after an accepted swap (and recomputed once per pass, so rounding
+does not accumulate), so no determinant is ever recomputed.
+"""
+
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from rsm import quadratic_terms, design_matrix, coded_to_actual, FACTORS
+
+
+def _factor_names(k):
+    return [f'X{i + 1}' for i in range(k)]
+
+
+def full_factorial(k, levels=(-1, 1)):
+    """All combinations of the given levels for k factors"""
+    return np.array(list(itertools.product(levels, repeat=k)), dtype=float)
+
+
+def central_composite(k, alpha='rotatable', center=6):
+    """
+    Central composite design in coded units: 2^k factorial points, 2k axial
+    points at ±alpha and `center` centre runs.
+
+    alpha may be 'rotatable' ((2^k)^(1/4), i.e. 2 for the four-factor
+    Table 4.1 design), 'face' (1, face-centred) or a number.
+    """
+    if alpha == 'rotatable':
+        alpha = (2 ** k) ** 0.25
+    elif alpha == 'face':
+        alpha = 1.0
+    else:
+        alpha = float(alpha)
+    factorial = full_factorial(k)
+    axial = np.zeros((2 * k, k))
+    for i in range(k):
+        axial[2 * i, i] = -alpha
+        axial[2 * i + 1, i] = alpha
+    centre = np.zeros((center, k))
+    design = np.vstack([factorial, axial, centre])
+    return pd.DataFrame(design, columns=_factor_names(k))
+
+
+def box_behnken(k, center=3):
+    """
+    Box–Behnken design in coded units: a 2² factorial on every pair of
+    factors with the remaining factors at 0, plus `center` centre runs.
+    """
+    if k < 3:
+        raise ValueError("Box–Behnken designs need at least 3 factors")
+    rows = []
+    for i, j in itertools.combinations(range(k), 2):
+        for a, b in itertools.product((-1, 1), repeat=2):
+            r = np.zeros(k)
+            r[i], r[j] = a, b
+            rows.append(r)
+    rows.extend(np.zeros(k) for _ in range(center))
+    return pd.DataFrame(np.array(rows), columns=_factor_names(k))
+
+
+def candidate_grid(k, levels=5, bound=1.0, constraint=None):
+    """
+    Regular grid of candidate points on [-bound, bound]^k, optionally
+    filtered by constraint(X) -> boolean array (constrained regions).
+    """
+    pts = full_factorial(k, np.linspace(-bound, bound, levels))
+    if constraint is not None:
+        pts = pts[np.asarray(constraint(pts), dtype=bool)]
+    return pts
+
+
+def design_efficiency(X_coded, terms=None, region=None):
+    """
+    D-efficiency (det(M/n)^(1/p)) and average scaled prediction variance
+    over region (defaults to the design points themselves).
+    """
+    F = design_matrix(X_coded, terms)
+    n, p = F.shape
+    M = F.T @ F
+    sign, logdet = np.linalg.slogdet(M / n)
+    d_eff = np.exp(logdet / p) if sign > 0 else 0.0
+    R = F if region is None else design_matrix(region, terms)
+    Minv = np.linalg.pinv(M)
+    avg_var = float(n * np.mean(np.einsum('ij,jk,ik->i', R, Minv, R)))
+    return {'D_efficiency': float(d_eff), 'avg_pred_variance': avg_var}
+
+
+def _downdate(Minv, x):
+    """Inverse without row x (Sherman–Morrison); also returns 1 - x'M⁻¹x"""
+    u = Minv @ x
+    d = x @ u
+    return Minv + np.outer(u, u) / (1 - d), 1 - d
+
+
+def _update(Minv, z):
+    """Inverse with row z added (Sherman–Morrison)"""
+    u = Minv @ z
+    return Minv - np.outer(u, u) / (1 + z @ u)
+
+
+def _swap_scores(Minv_minus, F_cand, criterion, W=None):
+    """
+    Score adding each row of F_cand to a design whose inverse information
+    matrix is Minv_minus. D: the determinant factor 1 + z'M⁻¹z (larger is
+    better). I: the resulting trace(M⁻¹W) (smaller is better), negated so
+    both criteria are maximised.
+    """
+    G = F_cand @ Minv_minus
+    dz = np.einsum('ij,ij->i', G, F_cand)
+    if criterion == 'D':
+        return 1 + dz
+    return -(np.trace(Minv_minus @ W) - np.einsum('ij,jk,ik->i', G, W, G) / (1 + dz))
+
+
+def _inverse(F, ridge=1e-6):
+    """(F'F)⁻¹, with a small ridge only while F'F is singular (random starts)"""
+    M = F.T @ F
+    if np.linalg.cond(M) < 1e12:
+        return np.linalg.inv(M)
+    return np.linalg.inv(M + ridge * np.eye(F.shape[1]))
+
+
+def _start(F, n_runs, rng):
+    idx = rng.choice(len(F), size=n_runs, replace=len(F) < n_runs)
+    return idx, _inverse(F[idx])
+
+
+def fedorov_exchange(candidates, n_runs, terms=None, criterion='D', n_starts=5,
+                     max_iter=100, seed=0):
+    """
+    D- or I-optimal n_runs-point design chosen from a candidate set
+    (rows of coded settings) by Fedorov point exchange. For each design row
+    all candidates are scored at once; the best improving swap is accepted.
+    """
+    criterion = criterion.upper()
+    if criterion not in ('D', 'I'):
+        raise ValueError("criterion must be 'D' or 'I'")
+    candidates = np.asarray(candidates, dtype=float)
+    k = candidates.shape[1]
+    terms = terms if terms is not None else quadratic_terms(k)
+    F = design_matrix(candidates, terms)
+    p = F.shape[1]
+    if n_runs < p:
+        raise ValueError(f"need at least {p} runs for {p} model terms")
+    W = F.T @ F / len(F) if criterion == 'I' else None
+    rng = np.random.default_rng(seed)
+
+    best_idx, best_val = None, -np.inf
+    for _ in range(n_starts):
+        idx, Minv = _start(F, n_runs, rng)
+        for _ in range(max_iter):
+            improved = False
+            for r in range(n_runs):
+                x = F[idx[r]]
+                Minv_minus, keep = _downdate(Minv, x)
+                scores = _swap_scores(Minv_minus, F, criterion, W)
+                j = int(np.argmax(scores))
+                if criterion == 'D':
+                    gain = keep * scores[j] > 1 + 1e-9
+                else:
+                    now = -np.trace(Minv @ W)
+                    gain = scores[j] > now + 1e-9 * abs(now)
+                if gain and j != idx[r]:
+                    idx[r] = j
+                    Minv = _update(Minv_minus, F[j])
+                    improved = True
+            if not improved:
+                break
+            # fresh inverse after each pass, so rounding and the start's
+            # ridge are not carried through the rank-one updates
+            Minv = _inverse(F[idx])
+        M = F[idx].T @ F[idx]
+        sign, logdet = np.linalg.slogdet(M)
+        if criterion == 'D':
+            val = logdet if sign > 0 else -np.inf
+        else:
+            val = -np.trace(np.linalg.pinv(M) @ W) if sign > 0 else -np.inf
+        if val > best_val:
+            best_idx, best_val = idx.copy(), val
+    return pd.DataFrame(candidates[best_idx], columns=_factor_names(k))
+
+
+def coordinate_exchange(k, n_runs, terms=None, criterion='D', levels=None,
+                        constraint=None, n_starts=5, max_iter=50, max_draws=None, seed=0):
+    """
+    D- or I-optimal design by coordinate exchange (Meyer & Nachtsheim).
+
+    Each coordinate of each run is replaced in turn by the best value from
+    `levels` (default 21 points on [-1, 1]); all trial values for that
+    coordinate are scored together with the rank-one determinant/trace
+    update. constraint(X) -> boolean array restricts the feasible region,
+    so the method works without enumerating a candidate grid. Starting
+    designs are drawn at random from the feasible levels; if fewer than
+    n_runs feasible points turn up in max_draws draws (default
+    1000 * n_runs) a ValueError is raised.
+    """
+    criterion = criterion.upper()
+    if criterion not in ('D', 'I'):
+        raise ValueError("criterion must be 'D' or 'I'")
+    terms = terms if terms is not None else quadratic_terms(k)
+    levels = np.linspace(-1, 1, 21) if levels is None else np.asarray(levels, dtype=float)
+    p = len(terms)
+    if n_runs < p:
+        raise ValueError(f"need at least {p} runs for {p} model terms")
+    rng = np.random.default_rng(seed)
+
+    W = None
+    if criterion == 'I':
+        # moment matrix of the (feasible) region from a Monte Carlo sample
+        U = rng.uniform(levels.min(), levels.max(), size=(20000, k))
+        if constraint is not None:
+            U = U[np.asarray(constraint(U), dtype=bool)]
+        FU = design_matrix(U, terms)
+        W = FU.T @ FU / len(FU)
+
+    max_draws = 1000 * n_runs if max_draws is None else int(max_draws)
+
+    def feasible_start():
+        rows, drawn = [], 0
+        while len(rows) < n_runs:
+            if drawn >= max_draws:
+                raise ValueError(f"only {len(rows)} of {n_runs} feasible runs found in "
+                                 f"{drawn} random draws; check the constraint or raise max_draws")
+            trial = rng.choice(levels, size=(min(4 * n_runs, max_draws - drawn), k))
+            drawn += len(trial)
+            if constraint is not None:
+                trial = trial[np.asarray(constraint(trial), dtype=bool)]
+            rows.extend(trial)
+        return np.array(rows[:n_runs])
+
+    best_X, best_val = None, -np.inf
+    for _ in range(n_starts):
+        X = feasible_start()
+        F = design_matrix(X, terms)
+        Minv = _inverse(F)
+        for _ in range(max_iter):
+            improved = False
+            for r in range(n_runs):
+                for c in range(k):
+                    trial = np.repeat(X[r:r + 1], len(levels), axis=0)
+                    trial[:, c] = levels
+                    if constraint is not None:
+                        ok = np.asarray(constraint(trial), dtype=bool)
+                        if not ok.any():
+                            continue
+                        trial = trial[ok]
+                    Ft = design_matrix(trial, terms)
+                    Minv_minus, keep = _downdate(Minv, F[r])
+                    scores = _swap_scores(Minv_minus, Ft, criterion, W)
+                    j = int(np.argmax(scores))
+                    if criterion == 'D':
+                        gain = keep * scores[j] > 1 + 1e-9
+                    else:
+                        now = -np.trace(Minv @ W)
+                        gain = scores[j] > now + 1e-9 * abs(now)
+                    if gain and not np.array_equal(trial[j], X[r]):
+                        X[r] = trial[j]
+                        F[r] = Ft[j]
+                        Minv = _update(Minv_minus, Ft[j])
+                        improved = True
+            if not improved:
+                break
+            Minv = _inverse(F)
+        M = F.T @ F
+        sign, logdet = np.linalg.slogdet(M)
+        if criterion == 'D':
+            val = logdet if sign > 0 else -np.inf
+        else:
+            val = -np.trace(np.linalg.pinv(M) @ W) if sign > 0 else -np.inf
+        if val > best_val:
+            best_X, best_val = X.copy(), val
+    return pd.DataFrame(best_X, columns=_factor_names(k))
+
+
+def to_actual(design):
+    """Add actual MC/HT/Ht/SET columns to a four-factor coded design"""
+    out = design.copy()
+    for code, name in zip(FACTORS, ['MC', 'HT', 'Ht', 'SET']):
+        out[name] = coded_to_actual(design[code], code)
+    return out
+
+
+def main():
+    """Generate candidate designs for the next extraction campaign"""
+    pd.set_option('display.width', 200)
+    k = len(FACTORS)
+    region = candidate_grid(k, levels=5, bound=2.0)
+
+    ccd = central_composite(k, alpha='rotatable', center=6)
+    fcd = central_composite(k, alpha='face', center=6)
+    bbd = box_behnken(k, center=3)
+    print(f"Rotatable CCD: {len(ccd)} runs, {design_efficiency(ccd.values, region=region)}")
+    print(f"Face-centred CCD: {len(fcd)} runs, {design_efficiency(fcd.values, region=region)}")
+    print(f"Box–Behnken: {len(bbd)} runs, {design_efficiency(bbd.values, region=region)}")
+
+    # Energy cap: heating temperature and heating time may not both be high
+    energy_cap = lambda X: X[:, 1] + X[:, 2] <= 2.0
+    cands = candidate_grid(k, levels=5, bound=2.0, constraint=energy_cap)
+    t0 = time.perf_counter()
+    dopt = fedorov_exchange(cands, 20, criterion='D')
+    print(f"\nD-optimal 20-run design from {len(cands)} constrained candidates "
+          f"({time.perf_counter() - t0:.2f} s): {design_efficiency(dopt.values, region=cands)}")
+    print(to_actual(dopt).round(2).to_string(index=False))
+
+    t0 = time.perf_counter()
+    iopt = fedorov_exchange(cands, 20, criterion='I')
+    print(f"\nI-optimal 20-run design ({time.perf_counter() - t0:.2f} s): "
+          f"{design_efficiency(iopt.values, region=cands)}")
+
+    t0 = time.perf_counter()
+    big = coordinate_exchange(6, 40, criterion='D', levels=np.linspace(-1, 1, 11),
+                              constraint=lambda X: X.sum(axis=1) <= 3.0, n_starts=3)
+    print(f"\nSix-factor constrained D-optimal design by coordinate exchange "
+          f"({time.perf_counter() - t0:.2f} s): {design_efficiency(big.values)}")
+
+
+if __name__ == "__main__":
+    main()
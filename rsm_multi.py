@@ -0,0 +1,193 @@
+"""
+Joint response-surface fit for several responses measured on one design.
+
+Each design row can carry more than one response (oil yield plus free fatty
+acid, colour, energy, ...). dat.py and data.py would need a separate
+sklearn/statsmodels fit per response, but the model matrix is the same for
+all of them. Here the thin QR of the model matrix is computed once and
+every response column is solved in one triangular solve with Q'Y. The
+ANOVA comes from the same factors for all responses at once:
+
+* Q'Y squared gives the sequential (type I) sums of squares of every term
+  for every response, so the Linear / Square / Interaction blocks are
+  column sums of one (p x r) array;
+* the hat diagonal (row sums of Q²) is shared, so PRESS and predicted R²
+  for all responses are a single division;
+* coefficient standard errors are the outer product of diag((X'X)⁻¹) and
+  the per-response σ².
+
+Extra responses therefore cost one more column in a few matrix products.
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from rsm import load_design, quadratic_terms, term_names, design_matrix, FACTORS
+
+
+def term_group(e):
+    """ANOVA block of an exponent tuple: Intercept, Linear, Square or Interaction"""
+    nonzero = [p for p in e if p > 0]
+    if not nonzero:
+        return 'Intercept'
+    if sum(nonzero) == 1:
+        return 'Linear'
+    if len(nonzero) == 1:
+        return 'Square'
+    return 'Interaction'
+
+
+class MultiResponseFit:
+    """Least-squares fit of every column of Y on one polynomial model matrix"""
+
+    def __init__(self, X_coded, Y, terms=None, factors=None, responses=None):
+        X_coded = np.asarray(X_coded, dtype=float)
+        Y = np.asarray(Y, dtype=float)
+        if Y.ndim == 1:
+            Y = Y[:, None]
+        self.terms = terms if terms is not None else quadratic_terms(X_coded.shape[1])
+        self.factors = factors or FACTORS[:X_coded.shape[1]]
+        self.responses = list(responses or [f'Y{j + 1}' for j in range(Y.shape[1])])
+        self.names = term_names(self.terms, self.factors)
+
+        F = design_matrix(X_coded, self.terms)
+        n, p = F.shape
+        self.n, self.p = n, p
+        self.Y = Y
+        self.Q, self.R = np.linalg.qr(F)
+        self.effects = self.Q.T @ Y                        # p x r
+        self.coef = np.linalg.solve(self.R, self.effects)  # p x r
+        self.fitted = F @ self.coef
+        self.resid = Y - self.fitted
+        self.sse = np.einsum('ij,ij->j', self.resid, self.resid)
+        self.df_resid = n - p
+        self.sigma2 = self.sse / self.df_resid
+        Rinv = np.linalg.inv(self.R)
+        self.xtx_inv = Rinv @ Rinv.T
+        self.leverage = np.einsum('ij,ij->i', self.Q, self.Q)
+
+    def predict(self, X_coded):
+        """Predicted values (m x r) for every response"""
+        return design_matrix(X_coded, self.terms) @ self.coef
+
+    def coefficients(self):
+        """Coefficient, standard error, t and p for every term and response"""
+        se = np.sqrt(np.outer(np.diag(self.xtx_inv), self.sigma2))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = self.coef / se
+        p = 2 * stats.t.sf(np.abs(t), self.df_resid)
+        r = len(self.responses)
+        return pd.DataFrame({
+            'Response': np.tile(self.responses, self.p),
+            'Term': np.repeat(self.names, r),
+            'Coefficient': self.coef.ravel(),
+            'Std_Error': se.ravel(),
+            't_value': t.ravel(),
+            'p_value': p.ravel()
+        }).sort_values('Response', kind='stable').reset_index(drop=True)
+
+    def anova(self):
+        """
+        Sequential ANOVA for all responses: Linear, Square and Interaction
+        blocks (each adjusted for the blocks before it), Model, Residual
+        and Total, in one long table.
+        """
+        groups = np.array([term_group(e) for e in self.terms])
+        seq_ss = self.effects ** 2
+        blocks = [g for g in ('Linear', 'Square', 'Interaction') if np.any(groups == g)]
+        ss = np.array([seq_ss[groups == g].sum(axis=0) for g in blocks])     # blocks x r
+        df = np.array([np.sum(groups == g) for g in blocks])
+        ss_model = ss.sum(axis=0)
+        df_model = df.sum()
+        ss_total = ss_model + self.sse
+
+        ss_all = np.vstack([ss, ss_model, self.sse, ss_total])
+        df_all = np.concatenate([df, [df_model, self.df_resid, self.n - 1]])
+        ms_all = ss_all / df_all[:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f_all = ms_all / self.sigma2
+        f_all[-2:] = np.nan
+        p_all = stats.f.sf(f_all, df_all[:, None], self.df_resid)
+
+        sources = blocks + ['Model', 'Residual', 'Total']
+        r = len(self.responses)
+        return pd.DataFrame({
+            'Response': np.tile(self.responses, len(sources)),
+            'Source': np.repeat(sources, r),
+            'DF': np.repeat(df_all, r),
+            'SS': ss_all.ravel(),
+            'MS': ms_all.ravel(),
+            'F': f_all.ravel(),
+            'p_value': p_all.ravel()
+        }).sort_values('Response', kind='stable').reset_index(drop=True)
+
+    def summary(self):
+        """R², adjusted R², predicted R² (from PRESS), RMSE and model F per response"""
+        sst = np.sum((self.Y - self.Y.mean(axis=0)) ** 2, axis=0)
+        r2 = 1 - self.sse / sst
+        adj_r2 = 1 - (1 - r2) * (self.n - 1) / self.df_resid
+        press_resid = self.resid / (1 - self.leverage)[:, None]
+        press = np.sum(press_resid ** 2, axis=0)
+        df_model = self.p - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            f = ((sst - self.sse) / df_model) / self.sigma2
+        return pd.DataFrame({
+            'Response': self.responses,
+            'R2': r2,
+            'Adj_R2': adj_r2,
+            'Pred_R2': 1 - press / sst,
+            'PRESS': press,
+            'RMSE': np.sqrt(self.sigma2),
+            'F': f,
+            'p_value': stats.f.sf(f, df_model, self.df_resid)
+        })
+
+
+def fit_responses(df, responses, factors=None, terms=None):
+    """Fit the named response columns of a design DataFrame jointly"""
+    factors = factors or FACTORS
+    return MultiResponseFit(df[factors].values, df[responses].values, terms, factors, responses)
+
+
+def main():
+    """
+    Joint fit of Table 4.1 responses. An optional CSV with a Run column
+    and further response columns is merged onto the design first.
+    """
+    df = load_design()
+    responses = ['Oil_Yield']
+    if len(sys.argv) > 1:
+        extra = pd.read_csv(sys.argv[1])
+        df = df.merge(extra, on='Run')
+        responses += [c for c in extra.columns if c != 'Run']
+    fit = fit_responses(df, responses)
+    pd.set_option('display.width', 200)
+    print(fit.summary().round(4).to_string(index=False))
+    print()
+    print(fit.anova().round(4).to_string(index=False))
+
+    # Cost of extra responses: many perturbed copies of the yield column
+    rng = np.random.default_rng(0)
+    r = 2000
+    Y = df['Oil_Yield'].values[:, None] + rng.normal(0, 1, size=(len(df), r))
+    t0 = time.perf_counter()
+    joint = MultiResponseFit(df[FACTORS].values, Y)
+    joint.anova()
+    joint.summary()
+    t_joint = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for j in range(50):
+        single = MultiResponseFit(df[FACTORS].values, Y[:, j])
+        single.anova()
+        single.summary()
+    t_single = (time.perf_counter() - t0) / 50 * r
+    print(f"\n{r} responses: joint fit + ANOVA {t_joint * 1e3:.0f} ms, "
+          f"one at a time ≈ {t_single * 1e3:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Pareto-front explorer: oil yield versus energy and time.
+
+The optimiser in dat.py maximises yield alone and lands on the hottest,
+longest settings (HT 90 °C, SET 180 min). Here the fitted yield surface and
+user-defined cost models are evaluated together over a dense factor grid and
+the non-dominated operating points are extracted with sort-based skyline
+algorithms:
+
+* two objectives — sort by the first, sweep keeping the running best of the
+  second (O(n log n));
+* three objectives — sort by the first and keep a staircase of the other two
+  in a sorted list, querying it with bisection (O(n log n) comparisons);
+* more objectives — sort-filter skyline in vectorized blocks.
+"""
+
+import bisect
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from rsm import load_design, coded_to_actual, FACTORS
+
+AMBIENT_C = 30.0
+
+
+def heating_energy_kj(actual, mass_kg=0.25, cp_kj_per_kg_k=2.0, loss_w_per_k=0.5):
+    """Sensible heat for the seed charge plus oven losses over the heating time"""
+    dT = actual['HT'] - AMBIENT_C
+    return mass_kg * cp_kj_per_kg_k * dT + loss_w_per_k * dT * actual['Ht'] * 60 / 1000
+
+
+def extraction_energy_kj(actual, heater_w=150.0):
+    """Soxhlet heating-mantle energy over the extraction time"""
+    return heater_w * actual['SET'] * 60 / 1000
+
+
+def default_cost_models():
+    """Energy (heating + Soxhlet) and total processing time"""
+    return {
+        'Energy_kJ': lambda a: heating_energy_kj(a) + extraction_energy_kj(a),
+        'Time_min': lambda a: a['Ht'] + a['SET']
+    }
+
+
+def evaluate_grid(predict, cost_models=None, n=21, bound=2.0):
+    """
+    Yield and cost of every point of an n^4 coded grid. predict maps coded
+    settings (m x 4) to yield; each cost model maps a DataFrame of actual
+    settings (MC, HT, Ht, SET) to a cost array.
+    """
+    cost_models = cost_models or default_cost_models()
+    axis = np.linspace(-bound, bound, n)
+    X = np.array(list(itertools.product(axis, repeat=len(FACTORS))))
+    out = pd.DataFrame(X, columns=FACTORS)
+    for code, name in zip(FACTORS, ['MC', 'HT', 'Ht', 'SET']):
+        out[name] = coded_to_actual(X[:, FACTORS.index(code)], code)
+    out['Yield'] = predict(X)
+    for name, model in cost_models.items():
+        out[name] = np.asarray(model(out), dtype=float)
+    return out
+
+
+def _front_2d(F):
+    order = np.lexsort((F[:, 1], F[:, 0]))
+    best = np.minimum.accumulate(F[order, 1])
+    # a point survives if its second objective beats every earlier point's
+    prev_best = np.concatenate([[np.inf], best[:-1]])
+    keep = F[order, 1] < prev_best
+    mask = np.zeros(len(F), dtype=bool)
+    mask[order[keep]] = True
+    return mask
+
+
+def _front_3d(F):
+    order = np.lexsort((F[:, 2], F[:, 1], F[:, 0]))
+    stair_b = []   # second objective, ascending
+    stair_c = []   # third objective, strictly descending along stair_b
+    mask = np.zeros(len(F), dtype=bool)
+    for i in order:
+        b, c = F[i, 1], F[i, 2]
+        pos = bisect.bisect_right(stair_b, b)
+        if pos > 0 and stair_c[pos - 1] <= c:
+            continue
+        mask[i] = True
+        # drop staircase entries the new point dominates in (b, c)
+        end = pos
+        while end < len(stair_b) and stair_c[end] >= c:
+            end += 1
+        stair_b[pos:end] = [b]
+        stair_c[pos:end] = [c]
+    return mask
+
+
+def _front_nd(F, block=4096):
+    order = np.argsort(F.sum(axis=1), kind='stable')
+    front = np.empty((0, F.shape[1]))
+    keep = []
+    for start in range(0, len(order), block):
+        idx = order[start:start + block]
+        P = F[idx]
+        dominated = np.zeros(len(idx), dtype=bool)
+        if len(front):
+            le = (front[None, :, :] <= P[:, None, :]).all(axis=2)
+            dominated |= le.any(axis=1)
+        # within the block, only earlier (smaller-sum) points can dominate
+        for j in range(len(idx)):
+            if dominated[j]:
+                continue
+            later = slice(j + 1, len(idx))
+            dominated[later] |= (P[j] <= P[later]).all(axis=1)
+        front = np.vstack([front, P[~dominated]])
+        keep.extend(idx[~dominated])
+    mask = np.zeros(len(F), dtype=bool)
+    mask[keep] = True
+    return mask
+
+
+def pareto_mask(F):
+    """
+    Boolean mask of the non-dominated rows of F (all objectives minimised).
+    Duplicate objective vectors are resolved once and share the result.
+    """
+    F = np.asarray(F, dtype=float)
+    U, inverse = np.unique(F, axis=0, return_inverse=True)
+    if U.shape[1] == 1:
+        mask_u = U[:, 0] == U[:, 0].min()
+    elif U.shape[1] == 2:
+        mask_u = _front_2d(U)
+    elif U.shape[1] == 3:
+        mask_u = _front_3d(U)
+    else:
+        mask_u = _front_nd(U)
+    return mask_u[inverse.ravel()]
+
+
+def pareto_front(table, objectives):
+    """
+    Non-dominated rows of table. objectives maps column name to 'max' or
+    'min'. The front is returned sorted by the first objective.
+    """
+    F = np.column_stack([-table[c].values if sense == 'max' else table[c].values
+                         for c, sense in objectives.items()])
+    front = table[pareto_mask(F)]
+    first, sense = next(iter(objectives.items()))
+    return front.sort_values(first, ascending=(sense == 'min')).reset_index(drop=True)
+
+
+def plot_front(table, front, x='Energy_kJ', y='Yield', colour='Time_min', path='pareto_front.png'):
+    """Scatter of all grid points with the Pareto set highlighted"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(9, 6))
+    ax.scatter(table[x], table[y], s=2, c='lightgrey', label='Grid points', rasterized=True)
+    sc = ax.scatter(front[x], front[y], s=14, c=front[colour], cmap='viridis', label='Pareto front')
+    plt.colorbar(sc, ax=ax, label=colour.replace('_', ' '))
+    ax.set_xlabel(x.replace('_', ' '), fontsize=12, fontweight='bold')
+    ax.set_ylabel('Predicted Oil Yield (%)', fontsize=12, fontweight='bold')
+    ax.set_title('Yield versus Energy and Time: Pareto Front', fontsize=14, fontweight='bold')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    fig.savefig(path, dpi=200, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def main():
+    """Pareto front of yield, energy and time for the Table 4.1 model"""
+    from rsm_model import RSMModel
+    df = load_design()
+    model = RSMModel.fit(df[FACTORS].values, df['Oil_Yield'].values)
+    table = evaluate_grid(model.predict, n=21)
+    front = pareto_front(table, {'Yield': 'max', 'Energy_kJ': 'min', 'Time_min': 'min'})
+    pd.set_option('display.width', 200)
+    print(f"{len(front)} non-dominated settings out of {len(table)} grid points")
+    print(front[['MC', 'HT', 'Ht', 'SET', 'Yield', 'Energy_kJ', 'Time_min']].head(20)
+          .round(2).to_string(index=False))
+    print("Saved", plot_front(table, front))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Term selection for the second-order jatropha RSM model.
+
+data.py fits all 15 terms of rsm_formula whether or not they are
+significant. This module searches every hierarchy-respecting subset of the
+14 non-intercept terms (or runs forward / backward stepwise selection) and
+ranks the candidates by AIC, BIC or PRESS.
+
+Candidate models are never refitted from scratch: the exhaustive search walks
+a subset tree in which each child adds one column to its parent, so the thin
+QR factor, residuals and leverages are extended by one Gram-Schmidt step.
+Backward elimination works on (X'X)^-1 and removes terms with rank-one
+downdates. Branches of the subset tree are spread over worker processes.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from rsm import load_design, quadratic_terms, term_names, design_matrix, FACTORS
+
+CRITERIA = ['aic', 'bic', 'press']
+
+
+def hierarchy_parents(terms):
+    """
+    For each term, the indices of the lower-order terms it requires
+    (X1^2 needs X1, X1:X2 needs X1 and X2). The intercept is always in.
+    """
+    index = {e: i for i, e in enumerate(terms)}
+    parents = []
+    for e in terms:
+        req = []
+        for i, p in enumerate(e):
+            if p > 0:
+                lower = list(e)
+                lower[i] -= 1
+                lower = tuple(lower)
+                if any(lower) and lower in index and index[lower] not in req:
+                    req.append(index[lower])
+        parents.append(req)
+    return parents
+
+
+def model_criteria(n, p, sse, press, sst):
+    """Fit statistics for models with p parameters (arrays broadcast)"""
+    sse = np.asarray(sse, dtype=float)
+    p = np.broadcast_to(np.asarray(p, dtype=float), sse.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        r2 = 1 - sse / sst
+        adj_r2 = 1 - (1 - r2) * (n - 1) / (n - p)
+        loglik_term = n * np.log(sse / n)
+        return {
+            'p': p.astype(int),
+            'sse': sse,
+            'r2': r2,
+            'adj_r2': adj_r2,
+            'aic': loglik_term + 2 * p,
+            'bic': loglik_term + p * np.log(n),
+            'press': np.asarray(press, dtype=float),
+            'pred_r2': 1 - np.asarray(press, dtype=float) / sst
+        }
+
+
+def _orthogonalize(Q, x, tol=1e-10):
+    """One Gram-Schmidt step (with re-orthogonalisation); None if x is dependent"""
+    v = x - Q @ (Q.T @ x)
+    v -= Q @ (Q.T @ v)
+    nrm = np.linalg.norm(v)
+    if nrm <= tol * max(np.linalg.norm(x), 1.0):
+        return None
+    return v / nrm
+
+
+def _walk(X, y, parents, prefix=(), max_depth=None):
+    """
+    Depth-first walk of the hierarchical subset tree below prefix.
+
+    Every node is one candidate model (intercept + the term indices on the
+    path). Nodes are recorded as (bitmask, p, sse, press). With max_depth
+    the walk stops at that many added terms and returns those nodes as an
+    unexplored frontier instead of recording them.
+    """
+    n, m = X.shape
+    Q = np.empty((n, m))
+    Q[:, 0] = X[:, 0] / np.linalg.norm(X[:, 0])
+    qy = Q[:, 0] @ y
+    resid = y - Q[:, 0] * qy
+    lev = Q[:, 0] ** 2
+    depth = 1
+    mask = 0
+    for j in prefix:
+        q = _orthogonalize(Q[:, :depth], X[:, j])
+        if q is None:
+            return [], []
+        Q[:, depth] = q
+        qy = q @ y
+        resid = resid - q * qy
+        lev = lev + q ** 2
+        depth += 1
+        mask |= 1 << j
+
+    records = []
+    frontier = []
+
+    def visit(depth, last, mask, resid, lev, path):
+        if max_depth is not None and len(path) == max_depth:
+            frontier.append(tuple(path))
+            return
+        with np.errstate(divide='ignore', invalid='ignore'):
+            press = np.sum((resid / (1 - lev)) ** 2)
+        records.append((mask, depth, float(resid @ resid), float(press)))
+        for j in range(last + 1, m):
+            if any(not (mask >> pj) & 1 for pj in parents[j]):
+                continue
+            q = _orthogonalize(Q[:, :depth], X[:, j])
+            if q is None:
+                continue
+            Q[:, depth] = q
+            qy = q @ y
+            visit(depth + 1, j, mask | (1 << j), resid - q * qy, lev + q ** 2, path + [j])
+
+    visit(depth, prefix[-1] if prefix else 0, mask, resid, lev, list(prefix))
+    return records, frontier
+
+
+def _walk_task(args):
+    X, y, parents, prefix = args
+    return _walk(X, y, parents, prefix)[0]
+
+
+def all_subsets(X, y, names, terms, criterion='bic', n_jobs=None, split_depth=2):
+    """
+    Evaluate every hierarchy-respecting subset of the non-intercept columns
+    of X (column 0 must be the intercept). Returns a DataFrame with one row
+    per candidate model, sorted by the chosen criterion (smaller is better).
+
+    The tree is cut at split_depth added terms and the resulting branches
+    are explored in n_jobs worker processes (all cores by default).
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}")
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    parents = hierarchy_parents(terms)
+
+    records, frontier = _walk(X, y, parents, max_depth=split_depth)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    tasks = [(X, y, parents, prefix) for prefix in frontier]
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            for part in pool.map(_walk_task, tasks):
+                records.extend(part)
+    else:
+        for task in tasks:
+            records.extend(_walk_task(task))
+
+    rec = np.array(records, dtype=object)
+    masks = rec[:, 0]
+    sst = float(np.sum((y - y.mean()) ** 2))
+    stats_ = model_criteria(n, rec[:, 1].astype(float), rec[:, 2].astype(float),
+                            rec[:, 3].astype(float), sst)
+    out = pd.DataFrame(stats_)
+    out.insert(0, 'terms', [
+        ' + '.join(names[j] for j in range(1, len(names)) if (mk >> j) & 1) or '(intercept only)'
+        for mk in masks
+    ])
+    out['mask'] = masks.astype(np.int64)
+    return out.sort_values(criterion, kind='mergesort').reset_index(drop=True)
+
+
+def _select_score(stats_, criterion):
+    return np.asarray(stats_[criterion], dtype=float)
+
+
+def backward_elimination(X, y, names, terms, criterion='bic'):
+    """
+    Backward elimination from the full model. At each step every removable
+    term (one with no higher-order term still depending on it) is scored in a
+    single vectorized pass using (X'X)^-1:
+
+        SSE'  = SSE + b_j^2 / C_jj
+        h'    = h - (X C)_.j^2 / C_jj
+        e'    = e + (X C)_.j * b_j / C_jj
+
+    and the inverse is downdated by a rank-one update when a term is dropped.
+    Returns (selected term names, step history DataFrame).
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}")
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    sst = float(np.sum((y - y.mean()) ** 2))
+    parents = hierarchy_parents(terms)
+
+    active = list(range(X.shape[1]))
+    C = np.linalg.inv(X.T @ X)
+    b = C @ (X.T @ y)
+    resid = y - X @ b
+    G = X @ C
+    lev = np.sum(G * X, axis=1)
+    sse = float(resid @ resid)
+
+    def score(p, sse, lev, resid):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            press = np.sum((resid / (1 - lev)) ** 2, axis=0)
+        return model_criteria(n, p, sse, press, sst)
+
+    current = score(len(active), sse, lev, resid)
+    history = [{'step': 0, 'removed': '', 'p': len(active),
+                **{c: float(current[c]) for c in CRITERIA}}]
+    step = 0
+    while len(active) > 1:
+        # positions (within active) that may be removed without breaking hierarchy
+        in_model = set(active)
+        cand = [pos for pos, j in enumerate(active) if j != 0 and
+                not any(j in parents[k] for k in in_model if k != j)]
+        if not cand:
+            break
+        cand = np.array(cand)
+        d = np.diag(C)[cand]
+        g = G[:, cand]
+        sse_new = sse + b[cand] ** 2 / d
+        lev_new = lev[:, None] - g ** 2 / d
+        resid_new = resid[:, None] + g * (b[cand] / d)
+        trial = score(len(active) - 1, sse_new, lev_new, resid_new)
+        vals = _select_score(trial, criterion)
+        best = int(np.nanargmin(vals))
+        if not vals[best] < float(current[criterion]):
+            break
+
+        pos = cand[best]
+        cj = C[:, pos].copy()
+        b = b - cj * (b[pos] / C[pos, pos])
+        C = C - np.outer(cj, cj) / C[pos, pos]
+        keep = np.arange(len(active)) != pos
+        b, C = b[keep], C[np.ix_(keep, keep)]
+        removed = active.pop(pos)
+        Xa = X[:, active]
+        G = Xa @ C
+        lev = lev_new[:, best]
+        resid = resid_new[:, best]
+        sse = float(sse_new[best])
+        current = {c: trial[c][best] for c in trial}
+        step += 1
+        history.append({'step': step, 'removed': names[removed], 'p': len(active),
+                        **{c: float(current[c]) for c in CRITERIA}})
+
+    return [names[j] for j in active], pd.DataFrame(history)
+
+
+def forward_selection(X, y, names, terms, criterion='bic'):
+    """
+    Forward selection from the intercept-only model. All eligible columns are
+    orthogonalised against the current Q in one matrix product, so scoring a
+    step costs O(n p m) and no candidate is refitted.
+    Returns (selected term names, step history DataFrame).
+    """
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}")
+    X = np.asarray(X, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n, m = X.shape
+    sst = float(np.sum((y - y.mean()) ** 2))
+    parents = hierarchy_parents(terms)
+
+    active = [0]
+    Q = X[:, :1] / np.linalg.norm(X[:, 0])
+    resid = y - Q[:, 0] * (Q[:, 0] @ y)
+    lev = Q[:, 0] ** 2
+
+    def score(p, resid, lev):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            press = np.sum((resid / (1 - lev)) ** 2, axis=0)
+        return model_criteria(n, p, np.sum(resid ** 2, axis=0), press, sst)
+
+    current = score(1, resid, lev)
+    history = [{'step': 0, 'added': '', 'p': 1, **{c: float(current[c]) for c in CRITERIA}}]
+    step = 0
+    while True:
+        in_model = set(active)
+        cand = [j for j in range(1, m) if j not in in_model
+                and all(pj in in_model for pj in parents[j])]
+        if not cand:
+            break
+        V = X[:, cand] - Q @ (Q.T @ X[:, cand])
+        V -= Q @ (Q.T @ V)
+        norms = np.linalg.norm(V, axis=0)
+        ok = norms > 1e-10 * np.maximum(np.linalg.norm(X[:, cand], axis=0), 1.0)
+        if not ok.any():
+            break
+        cand = [c for c, good in zip(cand, ok) if good]
+        V = V[:, ok] / norms[ok]
+        qy = V.T @ y
+        resid_new = resid[:, None] - V * qy
+        lev_new = lev[:, None] + V ** 2
+        trial = score(len(active) + 1, resid_new, lev_new)
+        vals = _select_score(trial, criterion)
+        best = int(np.nanargmin(vals))
+        if not vals[best] < float(current[criterion]):
+            break
+        active.append(cand[best])
+        Q = np.column_stack([Q, V[:, best]])
+        resid = resid_new[:, best]
+        lev = lev_new[:, best]
+        current = {c: trial[c][best] for c in trial}
+        step += 1
+        history.append({'step': step, 'added': names[cand[best]], 'p': len(active),
+                        **{c: float(current[c]) for c in CRITERIA}})
+
+    return [names[j] for j in sorted(active)], pd.DataFrame(history)
+
+
+def main():
+    """Run the exhaustive search and both stepwise directions on Table 4.1"""
+    df = load_design()
+    terms = quadratic_terms(len(FACTORS))
+    names = term_names(terms)
+    X = design_matrix(df[FACTORS].values, terms)
+    y = df['Oil_Yield'].values
+
+    t0 = time.perf_counter()
+    table = all_subsets(X, y, names, terms, criterion='bic')
+    elapsed = time.perf_counter() - t0
+    print(f"Evaluated {len(table)} hierarchical models in {elapsed:.2f} s")
+    pd.set_option('display.width', 200)
+    pd.set_option('display.max_colwidth', 90)
+    cols = ['terms', 'p', 'r2', 'adj_r2', 'aic', 'bic', 'press', 'pred_r2']
+    print("\nTop 10 models by BIC:")
+    print(table[cols].head(10).to_string(index=False))
+    print("\nTop 10 models by PRESS:")
+    print(table.sort_values('press')[cols].head(10).to_string(index=False))
+
+    selected, hist = backward_elimination(X, y, names, terms, criterion='bic')
+    print("\nBackward elimination (BIC):")
+    print(hist.to_string(index=False))
+    print("Selected:", ', '.join(selected))
+
+    selected, hist = forward_selection(X, y, names, terms, criterion='bic')
+    print("\nForward selection (BIC):")
+    print(hist.to_string(index=False))
+    print("Selected:", ', '.join(selected))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Precomputed 4-D prediction tensor for the jatropha response surface.
+
+dat.py and data.py hold the two non-plotted factors at the centre (0), so
+every slice at another level means rerunning a script. Here the fitted model
+is evaluated once over a dense coded grid and the predicted yield and
+prediction-interval half-width are written as memory-mapped .npy arrays.
+PredictionTensor.slice() then returns the 2-D surface for any factor pair at
+any fixed levels of the others, interpolating linearly between grid planes;
+only the 2–4 planes it needs are read from disk.
+"""
+
+import json
+import os
+import time
+
+import numpy as np
+
+from rsm import load_design, FACTORS
+
+
+class PredictionTensor:
+    """Memory-mapped grid of predictions over the coded factor space"""
+
+    def __init__(self, path, axis, factors, mean, half):
+        self.path = path
+        self.axis = axis
+        self.factors = list(factors)
+        self.mean = mean
+        self.half = half
+
+    @classmethod
+    def build(cls, model, path, n=41, bound=2.0, alpha=0.05, dtype=np.float32):
+        """
+        Evaluate model (an rsm_model.RSMModel) on an n^k grid over
+        [-bound, bound]^k and store it under the directory path.
+        The grid is filled plane by plane along the first axis.
+        """
+        os.makedirs(path, exist_ok=True)
+        k = len(model.factors)
+        axis = np.linspace(-bound, bound, n)
+        shape = (n,) * k
+        mean = np.lib.format.open_memmap(os.path.join(path, 'mean.npy'), mode='w+',
+                                         dtype=dtype, shape=shape)
+        half = np.lib.format.open_memmap(os.path.join(path, 'half.npy'), mode='w+',
+                                         dtype=dtype, shape=shape)
+        rest = np.stack(np.meshgrid(*([axis] * (k - 1)), indexing='ij'), axis=-1).reshape(-1, k - 1)
+        for i, a in enumerate(axis):
+            X = np.column_stack([np.full(len(rest), a), rest])
+            m, _, lo, hi = model.predict(X, interval='prediction', alpha=alpha)
+            mean[i] = m.reshape(shape[1:])
+            half[i] = ((hi - lo) / 2).reshape(shape[1:])
+        mean.flush()
+        half.flush()
+        meta = {'factors': model.factors, 'n': n, 'bound': bound, 'alpha': alpha}
+        with open(os.path.join(path, 'meta.json'), 'w') as fh:
+            json.dump(meta, fh)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path):
+        """Open a tensor written by build() without loading it into memory"""
+        with open(os.path.join(path, 'meta.json')) as fh:
+            meta = json.load(fh)
+        axis = np.linspace(-meta['bound'], meta['bound'], meta['n'])
+        mean = np.load(os.path.join(path, 'mean.npy'), mmap_mode='r')
+        half = np.load(os.path.join(path, 'half.npy'), mmap_mode='r')
+        return cls(path, axis, meta['factors'], mean, half)
+
+    def _bracket(self, value):
+        """Lower grid index and interpolation weight for a coded level"""
+        lo, hi = self.axis[0], self.axis[-1]
+        if not lo <= value <= hi:
+            raise ValueError(f"level {value} outside the tabulated range [{lo}, {hi}]")
+        i = int(np.clip(np.searchsorted(self.axis, value, side='right') - 1, 0, len(self.axis) - 2))
+        w = (value - self.axis[i]) / (self.axis[i + 1] - self.axis[i])
+        return i, w
+
+    def slice(self, x_var, y_var, fixed=None):
+        """
+        2-D surface of (x_var, y_var) with the other factors at the coded
+        levels in fixed (default 0). Returns (x, y, Z, half) where Z and
+        half are indexed [y, x] like np.meshgrid output, ready for contourf.
+        """
+        fixed = fixed or {}
+        ix, iy = self.factors.index(x_var), self.factors.index(y_var)
+        if ix == iy:
+            raise ValueError("x_var and y_var must differ")
+        others = [i for i in range(len(self.factors)) if i not in (ix, iy)]
+
+        # multilinear weights over the 2^(k-2) surrounding grid planes
+        brackets = [self._bracket(float(fixed.get(self.factors[i], 0.0))) for i in others]
+        Z = 0.0
+        H = 0.0
+        for corner in range(2 ** len(others)):
+            index = [slice(None)] * len(self.factors)
+            weight = 1.0
+            for b, (i, (lo, w)) in enumerate(zip(others, brackets)):
+                up = (corner >> b) & 1
+                if w == 0.0 and up:
+                    weight = 0.0
+                    break
+                index[i] = lo + up
+                weight *= w if up else 1 - w
+            if weight == 0.0:
+                continue
+            index = tuple(index)
+            Z = Z + weight * np.asarray(self.mean[index], dtype=float)
+            H = H + weight * np.asarray(self.half[index], dtype=float)
+        if ix < iy:
+            Z, H = Z.T, H.T
+        return self.axis, self.axis, Z, H
+
+
+def main():
+    """Build the tensor for Table 4.1 and time a few arbitrary slices"""
+    from rsm_model import RSMModel
+    df = load_design()
+    model = RSMModel.fit(df[FACTORS].values, df['Oil_Yield'].values)
+    t0 = time.perf_counter()
+    tensor = PredictionTensor.build(model, 'rsm_tensor', n=41)
+    print(f"Built {tensor.mean.shape} tensor in {time.perf_counter() - t0:.2f} s")
+
+    tensor = PredictionTensor.open('rsm_tensor')
+    for x_var, y_var, fixed in [('X1', 'X2', {}),
+                                ('X3', 'X4', {'X1': -1.0, 'X2': 1.0}),
+                                ('X2', 'X4', {'X1': 0.37, 'X3': -1.25})]:
+        t0 = time.perf_counter()
+        x, y, Z, H = tensor.slice(x_var, y_var, fixed)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{x_var} vs {y_var} at {fixed or 'centre'}: {ms:.2f} ms, "
+              f"yield {Z.min():.2f}–{Z.max():.2f} %, max PI half-width {H.max():.2f}")
+
+
+if __name__ == "__main__":
+    main()
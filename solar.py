@@ -0,0 +1,215 @@
+"""
+Solar input for the dryer: sun position, clear-sky irradiance on tilted
+planes and on the cylindrical dryer, logged pyranometer data, and per-trial
+efficiencies.
+
+abaspaper.py and dfg.py report chamber temperatures but no energy input, and
+abj.py works its efficiency out from an assumed 188 W/m². Everything here is
+vectorized over a DatetimeIndex (a full year at minute resolution is one
+call):
+
+* sun position from Spencer's declination and equation of time, for any
+  latitude/longitude (default Uyo, 5.05 °N 7.93 °E, UTC+1);
+* clear-sky beam and diffuse irradiance from Hottel's transmittance with
+  the tropical corrections, plus the Liu–Jordan diffuse ratio;
+* plane-of-array irradiance for any tilt and azimuth (isotropic sky plus
+  ground reflection), and the power intercepted by a vertical glazed
+  cylinder (side silhouette plus the top);
+* pyranometer CSVs are read into a Series. The insolation over many trial
+  windows comes from one cumulative trapezoid integral interpolated at all
+  the window edges, so drying and collector efficiencies for every trial
+  are computed in a single pass.
+"""
+
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+UYO = {'lat': 5.05, 'lon': 7.93, 'tz': 1.0, 'altitude': 0.038}
+SOLAR_CONSTANT = 1367.0   # W/m²
+H_FG = 2.40e6             # J/kg, latent heat used for the drying efficiency
+
+
+def solar_position(times, lat=UYO['lat'], lon=UYO['lon'], tz=UYO['tz']):
+    """
+    Zenith and azimuth (degrees; azimuth from south, west positive), hour
+    angle and declination for local clock times (DatetimeIndex, UTC+tz).
+    """
+    times = pd.DatetimeIndex(times)
+    hour = times.hour + times.minute / 60 + times.second / 3600
+    gamma = 2 * np.pi * (times.dayofyear.to_numpy() - 1 + (hour.to_numpy() - 12) / 24) / 365
+    decl = (0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+            - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+            - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma))
+    eot = 229.18 * (0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+                    - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma))
+    solar_time = hour.to_numpy() + (4 * (lon - 15 * tz) + eot) / 60
+    omega = np.radians(15 * (solar_time - 12))
+    phi = np.radians(lat)
+    cos_z = np.clip(np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.cos(omega), -1, 1)
+    zenith = np.arccos(cos_z)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cos_az = (cos_z * np.sin(phi) - np.sin(decl)) / (np.sin(zenith) * np.cos(phi))
+    azimuth = np.sign(omega) * np.arccos(np.clip(np.nan_to_num(cos_az), -1, 1))
+    return pd.DataFrame({'zenith': np.degrees(zenith), 'azimuth': np.degrees(azimuth),
+                         'hour_angle': np.degrees(omega), 'declination': np.degrees(decl)},
+                        index=times)
+
+
+def extraterrestrial(times):
+    """Extraterrestrial normal irradiance (W/m²)"""
+    n = pd.DatetimeIndex(times).dayofyear.to_numpy()
+    return SOLAR_CONSTANT * (1 + 0.033 * np.cos(2 * np.pi * n / 365))
+
+
+def clear_sky(times, lat=UYO['lat'], lon=UYO['lon'], tz=UYO['tz'], altitude=UYO['altitude'],
+              climate=(0.95, 0.98, 1.02)):
+    """
+    Hottel clear-sky beam normal, diffuse horizontal and global horizontal
+    irradiance (W/m²). altitude in km; climate holds the (r0, r1, rk)
+    corrections (tropical by default).
+    """
+    pos = solar_position(times, lat, lon, tz)
+    r0, r1, rk = climate
+    a0 = r0 * (0.4237 - 0.00821 * (6 - altitude) ** 2)
+    a1 = r1 * (0.5055 + 0.00595 * (6.5 - altitude) ** 2)
+    k = rk * (0.2711 + 0.01858 * (2.5 - altitude) ** 2)
+    cos_z = np.cos(np.radians(pos['zenith'].to_numpy()))
+    up = cos_z > 0.01
+    tau_b = np.where(up, a0 + a1 * np.exp(-k / np.where(up, cos_z, 1.0)), 0.0)
+    g0 = extraterrestrial(times)
+    beam = g0 * tau_b
+    diffuse = np.where(up, g0 * cos_z * (0.271 - 0.294 * tau_b), 0.0)
+    pos['beam_normal'] = beam
+    pos['diffuse'] = diffuse
+    pos['global'] = beam * np.clip(cos_z, 0, None) + diffuse
+    return pos
+
+
+def incidence_cosine(zenith, azimuth, tilt, surface_azimuth=0.0):
+    """cos of the beam incidence angle on a plane (degrees; azimuth from south)"""
+    z, a = np.radians(zenith), np.radians(azimuth)
+    b, g = np.radians(tilt), np.radians(surface_azimuth)
+    return np.cos(z) * np.cos(b) + np.sin(z) * np.sin(b) * np.cos(a - g)
+
+
+def tilted_irradiance(sky, tilt, surface_azimuth=0.0, albedo=0.2):
+    """Plane-of-array irradiance (W/m²) from a clear_sky-style table, isotropic sky"""
+    cos_i = incidence_cosine(sky['zenith'], sky['azimuth'], tilt, surface_azimuth)
+    b = np.radians(tilt)
+    return (sky['beam_normal'] * np.clip(cos_i, 0, None)
+            + sky['diffuse'] * (1 + np.cos(b)) / 2
+            + albedo * sky['global'] * (1 - np.cos(b)) / 2)
+
+
+def cylinder_irradiance(sky, radius=0.203, height=0.406, albedo=0.2):
+    """
+    Power (W) intercepted by a vertical cylinder with a glazed top: the beam
+    on its silhouette (2 r H sin z) and top (pi r² cos z), sky and ground
+    diffuse on the side as for a vertical wall, and sky diffuse on the top.
+    """
+    z = np.radians(sky['zenith'])
+    side, top = 2 * radius * height, np.pi * radius ** 2
+    beam = sky['beam_normal'] * (side * np.sin(z) * (z < np.pi / 2) + top * np.clip(np.cos(z), 0, None))
+    diffuse = (np.pi * radius * height * (sky['diffuse'] + albedo * sky['global'])
+               + top * sky['diffuse'])
+    return beam + diffuse
+
+
+def clear_sky_year(year=2025, freq='h', tilt=None, surface_azimuth=0.0, **site):
+    """
+    Clear-sky table for a whole year: sun position, beam/diffuse/global,
+    the cylinder dryer input and (if tilt is given) plane-of-array irradiance.
+    """
+    times = pd.date_range(f'{year}-01-01', f'{year + 1}-01-01', freq=freq, inclusive='left')
+    sky = clear_sky(times, **site)
+    sky['cylinder_W'] = cylinder_irradiance(sky)
+    if tilt is not None:
+        sky['tilted'] = tilted_irradiance(sky, tilt, surface_azimuth)
+    return sky
+
+
+def read_pyranometer(path, time_col='timestamp', value_col='irradiance'):
+    """Logged irradiance (W/m²) as a time-sorted Series; bad readings dropped"""
+    df = pd.read_csv(path, parse_dates=[time_col])
+    s = pd.Series(pd.to_numeric(df[value_col], errors='coerce').to_numpy(),
+                  index=pd.DatetimeIndex(df[time_col]), name=value_col)
+    s = s[np.isfinite(s.to_numpy())].sort_index()
+    return s.clip(lower=0)
+
+
+def _seconds(times):
+    return pd.DatetimeIndex(times).as_unit('ns').asi8 / 1e9
+
+
+def window_insolation(irradiance, starts, ends):
+    """
+    Insolation (J/m²) over many [start, end] windows of one irradiance
+    Series, from one cumulative trapezoid integral.
+    """
+    t = _seconds(irradiance.index)
+    g = irradiance.to_numpy(dtype=float)
+    cum = np.concatenate([[0.0], np.cumsum(0.5 * (g[1:] + g[:-1]) * np.diff(t))])
+    a = _seconds(starts)
+    b = _seconds(ends)
+    return np.interp(b, t, cum) - np.interp(a, t, cum)
+
+
+def trial_efficiency(trials, irradiance, area):
+    """
+    Drying efficiency for every trial: water removed x latent heat over the
+    solar energy reaching `area` (m²) during the trial. trials needs start,
+    end and water_kg columns; if it has air_flow_kg_s, t_in and t_out the
+    collector (air heating) efficiency is added.
+    """
+    out = trials.copy()
+    out['insolation_MJ_m2'] = window_insolation(irradiance, trials['start'], trials['end']) / 1e6
+    energy = out['insolation_MJ_m2'] * 1e6 * area
+    out['drying_efficiency'] = trials['water_kg'] * H_FG / energy
+    if {'air_flow_kg_s', 't_in', 't_out'} <= set(trials):
+        seconds = (pd.DatetimeIndex(trials['end']) - pd.DatetimeIndex(trials['start'])).total_seconds()
+        heat = trials['air_flow_kg_s'] * 1006.0 * (trials['t_out'] - trials['t_in']) * seconds.to_numpy()
+        out['collector_efficiency'] = heat / energy
+    return out
+
+
+def main():
+    """A clear-sky year at Uyo, then efficiencies from a logged day"""
+    pd.set_option('display.width', 200)
+    t0 = time.perf_counter()
+    year = clear_sky_year(freq='min', tilt=7.0)
+    elapsed = time.perf_counter() - t0
+    print(f"Clear-sky year at minute resolution ({len(year):,} rows) in {elapsed:.2f} s")
+    hours = 1 / 60
+    daily = year[['global', 'tilted', 'cylinder_W']].resample('MS').sum() * hours / 1000
+    daily = daily.div(year.resample('MS').size() / 1440, axis=0)
+    daily.columns = ['Horizontal kWh/m²/d', 'Tilt 7° S kWh/m²/d', 'Cylinder kWh/d']
+    daily.index = daily.index.strftime('%b')
+    print(daily.round(3).to_string())
+
+    # A logged day: clear sky thinned by passing cloud, as a pyranometer CSV
+    day = pd.date_range('2025-03-15 06:00', '2025-03-15 19:00', freq='min')
+    rng = np.random.default_rng(1)
+    cloud = np.clip(1 - 0.5 * (rng.random(len(day)) < 0.3) * rng.random(len(day)), 0, 1)
+    logged = clear_sky(day)['global'].to_numpy() * cloud
+    csv = io.StringIO(pd.DataFrame({'timestamp': day, 'irradiance': logged.round(1)})
+                      .to_csv(index=False))
+    irradiance = read_pyranometer(csv)
+
+    # The measured trays (dfg.py): 42.7 g of water over 14 h from 08:00 (abj.py)
+    trials = pd.DataFrame({
+        'trial': ['Both trays', 'Upper tray', 'Lower tray'],
+        'start': pd.to_datetime(['2025-03-15 08:00'] * 3),
+        'end': pd.to_datetime(['2025-03-15 22:00', '2025-03-15 22:00', '2025-03-15 22:00']),
+        'water_kg': [0.0427, 0.0213, 0.0214],
+        'air_flow_kg_s': [0.0015] * 3, 't_in': [30.0] * 3, 't_out': [40.2] * 3,
+    })
+    glazing_area = 0.1294   # m², abj.py
+    print()
+    print(trial_efficiency(trials, irradiance, glazing_area).to_string(index=False, float_format='%.4g'))
+
+
+if __name__ == "__main__":
+    main()